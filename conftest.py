@@ -0,0 +1 @@
+# Raiz do repositório no sys.path: ``pytest`` puro importa ``modules`` como ``python -m pytest``
@@ -0,0 +1,100 @@
+"""API Python das ferramentas, sem Streamlit (base do CLI e de benchmarks repetíveis).
+
+Cada função monta os parâmetros de um job e roda a tarefa correspondente de
+``modules.tarefas`` na hora, gravando a saída em ``saida``.
+"""
+from dataclasses import asdict
+from pathlib import Path
+
+from modules import tarefas
+
+
+def _sem_progresso(feitos, total, mensagem=""):
+    pass
+
+
+def _pasta(saida) -> Path:
+    pasta = Path(saida)
+    pasta.mkdir(parents=True, exist_ok=True)
+    return pasta
+
+
+def _nome_zip(base, shard):
+    """Cada fatia grava o próprio ZIP, para várias máquinas poderem usar a mesma pasta."""
+    return f"{base}_{shard[0]}de{shard[1]}.zip" if shard else f"{base}.zip"
+
+
+def converter(caminhos, saida, alvos=((1080, 1080),), cores=(None,), formatos=("png",), *,
+              rapido=True, perfil="máximo", max_bytes=None, processos=False,
+              deduplicar=True, semelhantes=False, shard=None, progresso=None) -> dict:
+    """Converte diretórios/ZIPs/imagens; com mais de um alvo, cor ou formato gera todas as variantes."""
+    alvos, cores, formatos = [tuple(a) for a in alvos], list(cores), list(formatos)
+    fan_out = len(alvos) * len(cores) * len(formatos) > 1
+    params = {
+        "caminhos": [str(c) for c in caminhos],
+        "shard": list(shard) if shard else None,
+        "nome_zip": _nome_zip("convertidas", shard),
+        "fan_out": fan_out,
+        "alvos": alvos if fan_out else [],
+        "cores": cores if fan_out else [],
+        "formatos": formatos if fan_out else [],
+        "target": alvos[0],
+        "bg_rgb": cores[0],
+        "out_format": formatos[0],
+        "rapido": rapido,
+        "perfil_cod": perfil,
+        "max_bytes": max_bytes,
+        "execucao": "Processos" if processos else "Threads",
+        "deduplicar": deduplicar,
+        "semelhantes": semelhantes,
+    }
+    return tarefas.converter_lote(_pasta(saida), params, progresso or _sem_progresso)
+
+
+def remover_fundo(caminhos, saida, model="u2net_human_seg", *, perfil=None, reduzir=False, refinar=True,
+                  processos=False, em_lote=True, tamanho_lote=None, canvas=None,
+                  deduplicar=True, semelhantes=False, shard=None, progresso=None) -> dict:
+    """Remove o fundo; ``perfil`` é um ``PerfilOnnx`` (None = sessão padrão do rembg)
+    e ``canvas = (target, bg_color, fmt)`` centraliza a saída."""
+    from modules.recorte import TAMANHO_LOTE
+
+    params = {
+        "caminhos": [str(c) for c in caminhos],
+        "shard": list(shard) if shard else None,
+        "nome_zip": _nome_zip("sem_fundo", shard),
+        "model": model,
+        "perfil": asdict(perfil) if perfil is not None else None,
+        "reduzir": reduzir,
+        "refinar": refinar,
+        "execucao": "Processos" if processos else "Threads",
+        "em_lote": em_lote,
+        "tamanho_lote": tamanho_lote or TAMANHO_LOTE,
+        "canvas": canvas,
+        "deduplicar": deduplicar,
+        "semelhantes": semelhantes,
+    }
+    return tarefas.remover_lote(_pasta(saida), params, progresso or _sem_progresso)
+
+
+def exportar_colecao(shop_name, collection, token, saida, *, api_version="2023-10",
+                     baixar=False, turbo=True, modo_api="auto", largura_cdn=None, conversao=None,
+                     progresso=None) -> dict:
+    """CSV com os links das imagens da coleção e, com ``baixar``, o ZIP das imagens.
+
+    ``modo_api``: ``rest``, ``bulk`` (Bulk Operation do GraphQL) ou ``auto``. As imagens
+    ficam no catálogo local (``modules.manifesto``): reexportar só baixa o que mudou.
+    ``largura_cdn`` pede as imagens já reduzidas à CDN da Shopify e
+    ``conversao = (target, bg_color, fmt)`` converte cada uma em memória direto para o ZIP.
+    """
+    params = {
+        "shop_name": shop_name,
+        "api_version": api_version,
+        "collection_input": collection,
+        "baixar": baixar,
+        "turbo": turbo,
+        "modo_api": modo_api,
+        "largura_cdn": largura_cdn,
+        "conversao": conversao,
+        "access_token": token,
+    }
+    return tarefas.exportar_colecao(_pasta(saida), params, progresso or _sem_progresso)
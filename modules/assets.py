@@ -0,0 +1,28 @@
+"""Assets estáticos do app.
+
+Imagens são servidas pelo static serving do Streamlit (``.streamlit/config.toml``)
+em ``app/static/<arquivo>``, com ETag/Last-Modified: o navegador baixa uma vez e
+as reexecuções só mandam a URL. O Streamlit só serve com o Content-Type certo
+imagens e PDFs, então o ping (WAV) vai como data URI montado uma vez por processo.
+"""
+import base64
+from functools import lru_cache
+from pathlib import Path
+
+import streamlit as st
+
+PASTA = Path(__file__).resolve().parent.parent / "static"
+URL_BASE = "app/static"
+
+
+def url(nome: str) -> str:
+    return f"{URL_BASE}/{nome}"
+
+
+@lru_cache(maxsize=None)
+def data_uri(nome: str, mime: str) -> str:
+    return f"data:{mime};base64," + base64.b64encode((PASTA / nome).read_bytes()).decode("ascii")
+
+
+def tocar_ping():
+    st.markdown(f'<audio autoplay src="{data_uri("ping.wav", "audio/wav")}"></audio>', unsafe_allow_html=True)
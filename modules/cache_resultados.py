@@ -0,0 +1,124 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+# ============== Configuração ==============
+CACHE_DIR = os.environ.get("V2_CACHE_DIR", ".cache_v2labs/resultados")
+MAX_MEMORIA = int(os.environ.get("V2_CACHE_MEMORIA_MB", "256")) * 1024 * 1024
+MAX_DISCO = int(os.environ.get("V2_CACHE_DISCO_MB", "2048")) * 1024 * 1024
+
+
+def hash_bytes(raw: bytes) -> str:
+    """Hash de conteúdo usado como parte da chave do cache."""
+    return hashlib.sha256(raw).hexdigest()
+
+
+def chave(hash_entrada: str, ferramenta: str, *params) -> str:
+    """Monta a chave (hash da entrada, ferramenta, parâmetros)."""
+    base = "|".join([hash_entrada, ferramenta] + [repr(p) for p in params])
+    return hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Cache LRU de resultados em memória e em disco, limitado por tamanho."""
+
+    def __init__(self, pasta=CACHE_DIR, max_memoria=MAX_MEMORIA, max_disco=MAX_DISCO):
+        self.pasta = Path(pasta)
+        self.max_memoria = max_memoria
+        self.max_disco = max_disco
+        self._mem = OrderedDict()
+        self._mem_bytes = 0
+        self._disco_bytes = 0
+        self._lock = threading.Lock()
+        self.pasta.mkdir(parents=True, exist_ok=True)
+        for p in self.pasta.rglob("*"):
+            if p.is_file():
+                self._disco_bytes += p.stat().st_size
+
+    def _caminho(self, k: str) -> Path:
+        return self.pasta / k[:2] / k
+
+    def get(self, k: str):
+        with self._lock:
+            if k in self._mem:
+                self._mem.move_to_end(k)
+                return self._mem[k]
+        p = self._caminho(k)
+        try:
+            data = p.read_bytes()
+            os.utime(p)  # marca como usado recentemente para a evicção
+        except OSError:
+            return None
+        with self._lock:
+            self._guardar_memoria(k, data)
+        return data
+
+    def put(self, k: str, data: bytes):
+        with self._lock:
+            self._guardar_memoria(k, data)
+        p = self._caminho(k)
+        if p.exists():
+            return
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_suffix(".tmp")
+        try:
+            tmp.write_bytes(data)
+            os.replace(tmp, p)
+        except OSError:
+            return
+        with self._lock:
+            self._disco_bytes += len(data)
+            excedeu = self._disco_bytes > self.max_disco
+        if excedeu:
+            self._evictar_disco()
+
+    def _guardar_memoria(self, k: str, data: bytes):
+        if len(data) > self.max_memoria:
+            return
+        if k in self._mem:
+            self._mem.move_to_end(k)
+            return
+        self._mem[k] = data
+        self._mem_bytes += len(data)
+        while self._mem_bytes > self.max_memoria:
+            _, antigo = self._mem.popitem(last=False)
+            self._mem_bytes -= len(antigo)
+
+    def _evictar_disco(self):
+        """Remove os arquivos menos usados até caber em ~90% do limite."""
+        arquivos = []
+        for p in self.pasta.rglob("*"):
+            try:
+                if p.is_file():
+                    st_ = p.stat()
+                    arquivos.append((st_.st_mtime, st_.st_size, p))
+            except OSError:
+                continue
+        arquivos.sort()
+        total = sum(a[1] for a in arquivos)
+        alvo = int(self.max_disco * 0.9)
+        for _, tam, p in arquivos:
+            if total <= alvo:
+                break
+            try:
+                p.unlink()
+                total -= tam
+            except OSError:
+                pass
+        with self._lock:
+            self._disco_bytes = total
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResultCache:
+    """Instância única do cache, compartilhada por todas as sessões do processo."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
@@ -0,0 +1,46 @@
+"""Import preguiçoso das páginas, com o tempo de inicialização registrado.
+
+Cada ferramenta só é importada quando a rota dela é aberta (o removedor puxa
+rembg/onnxruntime, que não precisam atrasar a home). O primeiro import de cada
+módulo e marcos como a primeira renderização ficam em um relatório por processo,
+também impresso no stderr. Para o detalhe por dependência: ``python -X importtime``.
+"""
+import importlib
+import sys
+import threading
+import time
+
+INICIO = time.perf_counter()
+
+_tempos = {}  # etapa -> (ms desde o início do processo, duração em ms)
+_lock = threading.Lock()
+
+
+def _registrar(etapa: str, duracao: float):
+    agora = time.perf_counter()
+    with _lock:
+        if etapa in _tempos:
+            return
+        _tempos[etapa] = ((agora - INICIO) * 1000, duracao * 1000)
+    print(f"[inicialização] {etapa}: {duracao * 1000:.0f} ms (t+{(agora - INICIO) * 1000:.0f} ms)", file=sys.stderr, flush=True)
+
+
+def importar(nome: str):
+    """``importlib.import_module`` que mede o primeiro import do módulo."""
+    if nome in sys.modules:
+        return sys.modules[nome]
+    t0 = time.perf_counter()
+    modulo = importlib.import_module(nome)
+    _registrar(f"import {nome}", time.perf_counter() - t0)
+    return modulo
+
+
+def marcar(etapa: str):
+    """Marco sem duração própria (ex.: primeira renderização da home)."""
+    _registrar(etapa, 0.0)
+
+
+def relatorio():
+    with _lock:
+        return [{"etapa": etapa, "t+ (ms)": round(t), "duração (ms)": round(d)}
+                for etapa, (t, d) in sorted(_tempos.items(), key=lambda kv: kv[1][0])]
@@ -0,0 +1,153 @@
+"""CLI das ferramentas, sem navegador.
+
+    python -m modules.cli conversor fotos/ lote.zip -o saida/ --resolucao 1080x1080 --formato png webp
+    find catalogo -name '*.jpg' | python -m modules.cli removedor - -o saida/ --shard 3/8
+    python -m modules.cli extrator --loja a608d7-cf --colecao dunk -o saida/ --baixar
+    python -m modules.cli extrator --loja a608d7-cf --colecao dunk -o saida/ --baixar --largura-cdn 1080 --converter 1080x1080
+
+Entradas: diretórios (recursivos), ZIPs, imagens ou ``-`` para ler uma lista de
+caminhos da entrada padrão. ``--shard i/n`` processa só a fatia i (base 0) de n,
+decidida pelo hash do caminho, então máquinas diferentes dividem o lote sem se
+coordenar. O resultado (JSON) sai na saída padrão; o progresso, na de erros.
+"""
+import argparse
+import json
+import os
+import sys
+
+from modules import api
+from modules.codificacao import PERFIL_PADRAO, PERFIS
+from modules.sessoes_onnx import MODELOS
+
+
+def _caminhos(entradas):
+    caminhos = []
+    for e in entradas:
+        if e == "-":
+            caminhos.extend(linha.strip() for linha in sys.stdin if linha.strip())
+        else:
+            caminhos.append(e)
+    return caminhos
+
+
+def _shard(texto):
+    try:
+        i, n = (int(x) for x in texto.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("use i/n, por exemplo 0/4")
+    if not 0 <= i < n:
+        raise argparse.ArgumentTypeError("é preciso 0 <= i < n")
+    return i, n
+
+
+def _resolucao(texto):
+    try:
+        w, h = (int(x) for x in texto.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("use LxA, por exemplo 1080x1920")
+    return w, h
+
+
+def _cor(texto):
+    if texto.lower() in ("transparente", "none"):
+        return None
+    hexcor = texto.strip("#")
+    try:
+        return tuple(int(hexcor[i:i + 2], 16) for i in (0, 2, 4))
+    except ValueError:
+        raise argparse.ArgumentTypeError("use hex (#f2f2f2) ou 'transparente'")
+
+
+def _progresso(feitos, total, mensagem=""):
+    print(f"\r{mensagem or f'{feitos}/{total}'}", end="" if feitos < total else "\n", file=sys.stderr, flush=True)
+
+
+def _comum(p):
+    p.add_argument("entradas", nargs="+", help="diretórios, ZIPs, imagens ou - (lista de caminhos no stdin)")
+    p.add_argument("-o", "--saida", required=True, help="pasta onde o ZIP de saída é gravado")
+    p.add_argument("--shard", type=_shard, help="processa só a fatia i/n do lote")
+    p.add_argument("--processos", action="store_true", help="executa em processos (todos os núcleos)")
+    p.add_argument("--sem-dedup", dest="deduplicar", action="store_false", help="não detecta imagens duplicadas")
+    p.add_argument("--semelhantes", action="store_true", help="trata quase idênticas (hash perceptual) como duplicadas")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m modules.cli", description=__doc__.split("\n")[0])
+    sub = parser.add_subparsers(dest="ferramenta", required=True)
+
+    p = sub.add_parser("conversor", help="centraliza e converte imagens")
+    _comum(p)
+    p.add_argument("--resolucao", type=_resolucao, nargs="+", default=[(1080, 1080)])
+    p.add_argument("--cor", type=_cor, nargs="+", default=[None], help="cores de fundo (hex) ou 'transparente'")
+    p.add_argument("--formato", nargs="+", default=["png"], choices=("png", "jpg", "webp"))
+    p.add_argument("--perfil", default=PERFIL_PADRAO, choices=list(PERFIS), help="perfil de codificação")
+    p.add_argument("--max-kb", type=int, help="limite de tamanho por arquivo")
+    p.add_argument("--sem-draft", dest="rapido", action="store_false", help="decodifica a imagem inteira")
+
+    p = sub.add_parser("removedor", help="remove o fundo das imagens")
+    _comum(p)
+    p.add_argument("--modelo", default=MODELOS[0], choices=MODELOS)
+    p.add_argument("--perfil-onnx", help="nome de um perfil salvo em perfis_onnx.json")
+    p.add_argument("--reduzir", action="store_true", help="inferência em baixa resolução")
+    p.add_argument("--sem-refinar", dest="refinar", action="store_false")
+    p.add_argument("--sem-lote", dest="em_lote", action="store_false", help="uma chamada ao modelo por imagem")
+    p.add_argument("--tamanho-lote", type=int)
+    p.add_argument("--canvas", type=_resolucao, help="centraliza em LxA após remover o fundo")
+    p.add_argument("--canvas-cor", type=_cor, default=None)
+    p.add_argument("--canvas-formato", default="png", choices=("png", "jpg", "webp"))
+
+    p = sub.add_parser("extrator", help="exporta as imagens de uma coleção da Shopify")
+    p.add_argument("-o", "--saida", required=True)
+    p.add_argument("--loja", required=True)
+    p.add_argument("--colecao", required=True, help="ID, handle ou URL da coleção")
+    p.add_argument("--api-version", default="2023-10")
+    p.add_argument("--token", default=os.environ.get("SHOPIFY_ACCESS_TOKEN"), help="padrão: $SHOPIFY_ACCESS_TOKEN")
+    p.add_argument("--baixar", action="store_true", help="baixa as imagens e gera o ZIP por produto")
+    p.add_argument("--sem-turbo", dest="turbo", action="store_false")
+    p.add_argument("--modo-api", default="auto", choices=("auto", "rest", "bulk"),
+                   help="listagem pela REST, pela Bulk Operation do GraphQL ou automática pelo tamanho")
+    p.add_argument("--largura-cdn", type=int, help="pede à CDN da Shopify as imagens com esta largura (px)")
+    p.add_argument("--converter", type=_resolucao, help="com --baixar: converte cada imagem para LxA em memória, direto no ZIP")
+    p.add_argument("--converter-cor", type=_cor, default=None)
+    p.add_argument("--converter-formato", default="jpg", choices=("png", "jpg", "webp"))
+
+    args = parser.parse_args(argv)
+    if args.ferramenta == "conversor":
+        resultado = api.converter(
+            _caminhos(args.entradas), args.saida, args.resolucao, args.cor, args.formato,
+            rapido=args.rapido, perfil=args.perfil, max_bytes=args.max_kb and args.max_kb * 1024,
+            processos=args.processos, deduplicar=args.deduplicar, semelhantes=args.semelhantes,
+            shard=args.shard, progresso=_progresso,
+        )
+    elif args.ferramenta == "removedor":
+        perfil = None
+        if args.perfil_onnx:
+            from modules.perfis_onnx import carregar_perfis
+            perfis = carregar_perfis()
+            if args.perfil_onnx not in perfis:
+                parser.error(f"perfil ONNX desconhecido: {args.perfil_onnx} (disponíveis: {', '.join(perfis)})")
+            perfil = perfis[args.perfil_onnx]
+        canvas = (args.canvas, args.canvas_cor, args.canvas_formato) if args.canvas else None
+        resultado = api.remover_fundo(
+            _caminhos(args.entradas), args.saida, args.modelo, perfil=perfil, reduzir=args.reduzir,
+            refinar=args.refinar, processos=args.processos, em_lote=args.em_lote, tamanho_lote=args.tamanho_lote,
+            canvas=canvas, deduplicar=args.deduplicar, semelhantes=args.semelhantes,
+            shard=args.shard, progresso=_progresso,
+        )
+    else:
+        if not args.token:
+            parser.error("informe --token ou SHOPIFY_ACCESS_TOKEN")
+        conversao = (args.converter, args.converter_cor, args.converter_formato) if args.converter else None
+        resultado = api.exportar_colecao(
+            args.loja, args.colecao, args.token, args.saida, api_version=args.api_version,
+            baixar=args.baixar, turbo=args.turbo, modo_api=args.modo_api, largura_cdn=args.largura_cdn,
+            conversao=conversao, progresso=_progresso,
+        )
+
+    json.dump(resultado, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+    return 1 if resultado.get("erros") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+import io
+import time
+
+from PIL import Image
+
+# ============== Perfis de codificação (velocidade × tamanho) ==============
+# "máximo" reproduz as configurações originais do conversor
+PERFIS = {
+    "rápido": {
+        "png": {"compress_level": 1},
+        "jpg": {"quality": 85},
+        "webp": {"quality": 80, "method": 0},
+    },
+    "equilibrado": {
+        "png": {"compress_level": 6},
+        "jpg": {"quality": 90, "optimize": True},
+        "webp": {"quality": 90, "method": 4},
+    },
+    "máximo": {
+        "png": {"optimize": True},
+        "jpg": {"quality": 92, "optimize": True},
+        "webp": {"quality": 95},
+    },
+}
+PERFIL_PADRAO = "máximo"
+QUALIDADE_MIN = 20
+
+
+def _salvar(img: Image.Image, fmt: str, **params) -> bytes:
+    bio = io.BytesIO()
+    if fmt == "jpg":
+        img.convert("RGB").save(bio, format="JPEG", **params)
+    elif fmt == "png":
+        img.save(bio, format="PNG", **params)
+    else:
+        img.save(bio, format="WEBP", **params)
+    return bio.getvalue()
+
+
+def _buscar(salvar, lo, hi, max_bytes):
+    """Busca binária do maior valor em [lo, hi] cujo resultado cabe em ``max_bytes`` (ou None)."""
+    melhor = None
+    while lo <= hi:
+        v = (lo + hi) // 2
+        data = salvar(v)
+        if len(data) <= max_bytes:
+            melhor, lo = data, v + 1
+        else:
+            hi = v - 1
+    return melhor
+
+
+def _qualidade_no_limite(img, fmt, params, max_bytes) -> bytes:
+    """Maior qualidade que cabe em ``max_bytes`` (JPEG/WebP).
+
+    No WebP o alfa é sem perdas por padrão e pode sozinho estourar o limite; sem
+    caber na qualidade mínima, busca também o ``alpha_quality``. Se nada couber,
+    devolve o menor resultado (quem chama confere o tamanho).
+    """
+    melhor = _buscar(lambda q: _salvar(img, fmt, **{**params, "quality": q}),
+                     QUALIDADE_MIN, params.get("quality", 95), max_bytes)
+    if melhor is not None:
+        return melhor
+    if fmt == "webp" and img.mode in ("RGBA", "LA", "PA"):
+        base = {**params, "quality": QUALIDADE_MIN}
+        melhor = _buscar(lambda a: _salvar(img, fmt, **{**base, "alpha_quality": a}), 0, 99, max_bytes)
+        return melhor or _salvar(img, fmt, **{**base, "alpha_quality": 0})
+    return _salvar(img, fmt, **{**params, "quality": QUALIDADE_MIN})
+
+
+def _png_no_limite(img, params, max_bytes) -> bytes:
+    """PNG sem perdas até onde der; depois paleta com cada vez menos cores."""
+    data = _salvar(img, "png", **params)
+    if len(data) <= max_bytes:
+        return data
+    data = _salvar(img, "png", optimize=True)
+    if len(data) <= max_bytes:
+        return data
+    metodo = Image.Quantize.FASTOCTREE if img.mode == "RGBA" else Image.Quantize.MEDIANCUT
+    for cores in (256, 128, 64, 32):
+        data = _salvar(img.quantize(cores, method=metodo), "png", optimize=True)
+        if len(data) <= max_bytes:
+            break
+    return data
+
+
+def codificar(img: Image.Image, fmt: str, perfil: str = PERFIL_PADRAO, max_bytes=None) -> bytes:
+    """Codifica no formato de saída com o perfil escolhido e, opcionalmente, um teto de bytes."""
+    fmt = fmt.lower()
+    params = PERFIS[perfil][fmt]
+    if not max_bytes:
+        return _salvar(img, fmt, **params)
+    if fmt == "png":
+        return _png_no_limite(img, params, max_bytes)
+    return _qualidade_no_limite(img, fmt, params, max_bytes)
+
+
+def medir_perfis(imagens, formatos, perfis=None, max_bytes=None):
+    """Tempo e tamanho médios de codificação por perfil e formato sobre as mesmas imagens."""
+    linhas = []
+    for perfil in perfis or PERFIS:
+        for fmt in formatos:
+            total, tamanho, acima = 0.0, 0, 0
+            for img in imagens:
+                t0 = time.perf_counter()
+                data = codificar(img, fmt, perfil, max_bytes)
+                total += time.perf_counter() - t0
+                tamanho += len(data)
+                acima += bool(max_bytes and len(data) > max_bytes)
+            n = len(imagens)
+            linhas.append({
+                "perfil": perfil,
+                "formato": fmt,
+                "ms/imagem": round(1000 * total / n, 1),
+                "KB médio": round(tamanho / n / 1024, 1),
+                "acima do limite": acima,
+            })
+    return linhas
@@ -0,0 +1,107 @@
+import io
+import math
+import pickle
+
+from PIL import Image
+
+from modules.codificacao import PERFIL_PADRAO, codificar
+
+FORMATOS = ("png", "jpg", "webp")
+_MODOS_REDUCE = {"L", "LA", "La", "RGB", "RGBA", "RGBa", "CMYK", "YCbCr", "I", "F"}
+
+
+def abrir_para_alvo(raw: bytes, *alvos) -> Image.Image:
+    """Decodifica já reduzido para a menor escala acima do(s) alvo(s).
+
+    JPEG usa o draft do decodificador (1/2, 1/4, 1/8 direto do DCT); os demais
+    formatos usam ``reduce()``. O LANCZOS final é feito em ``resize_and_center``.
+    """
+    img = Image.open(io.BytesIO(raw))
+    w, h = img.size
+    scale = max(min(t[0]/w, t[1]/h) for t in alvos)
+    if scale >= 1:
+        return img
+    need = (math.ceil(w*scale), math.ceil(h*scale))
+    if img.format == "JPEG":
+        img.draft(img.mode, need)
+        return img
+    fator = min(w // need[0], h // need[1])
+    if fator <= 1:
+        return img
+    # reduce() não aceita 1/P/I;16 (e em PA faria média dos índices da paleta)
+    if img.mode.startswith("I;16"):
+        img = img.convert("I")
+    elif img.mode not in _MODOS_REDUCE:
+        img = img.convert("RGBA")
+    return img.reduce(fator)
+
+
+def redimensionar(img: Image.Image, target_size) -> Image.Image:
+    """LANCZOS para caber no alvo (parte compartilhada entre cores de fundo e formatos)."""
+    w, h = img.size
+    scale = min(target_size[0]/w, target_size[1]/h)
+    new_w, new_h = max(1, int(w*scale)), max(1, int(h*scale))
+    img = img.resize((new_w, new_h), Image.Resampling.LANCZOS)
+    if img.mode != "RGBA":
+        img = img.convert("RGBA")
+    return img
+
+
+def centralizar(img: Image.Image, target_size, bg_color=None) -> Image.Image:
+    """Cola a imagem já redimensionada no centro do canvas."""
+    # Se bg_color for None → manter transparência
+    if bg_color is None:
+        canvas = Image.new("RGBA", target_size, (0, 0, 0, 0))
+    else:
+        canvas = Image.new("RGB", target_size, bg_color)
+
+    off = ((target_size[0]-img.width)//2, (target_size[1]-img.height)//2)
+    canvas.paste(img, off, img)
+    return canvas
+
+
+def resize_and_center(img: Image.Image, target_size, bg_color=None):
+    """Redimensiona e centraliza a imagem, opcionalmente com cor de fundo."""
+    return centralizar(redimensionar(img, target_size), target_size, bg_color)
+
+
+def converter_bytes(raw: bytes, target, bg_color, fmt, rapido: bool = True,
+                    perfil: str = PERFIL_PADRAO, max_bytes=None) -> bytes:
+    """Conversão completa de uma imagem (usada pelos workers de thread e de processo)."""
+    img = abrir_para_alvo(raw, target) if rapido else Image.open(io.BytesIO(raw))
+    return codificar(resize_and_center(img.convert("RGBA"), target, bg_color), fmt, perfil, max_bytes)
+
+
+def nome_cor(bg_color) -> str:
+    return "transparente" if bg_color is None else "%02x%02x%02x" % tuple(bg_color)
+
+
+def converter_variantes(raw: bytes, alvos, cores, formatos, rapido: bool = True,
+                        perfil: str = PERFIL_PADRAO, max_bytes=None):
+    """Fan-out: uma decodificação, um resample por alvo e uma codificação por variante.
+
+    Devolve ``[(pasta, fmt, bytes)]`` com ``pasta = "1080x1080/ffffff/jpg"``.
+    """
+    # Decodifica na escala do alvo que exige mais pixels; os demais partem dela
+    img = abrir_para_alvo(raw, *alvos) if rapido else Image.open(io.BytesIO(raw))
+    img = img.convert("RGBA")
+    saidas = []
+    for alvo in alvos:
+        reduzida = redimensionar(img, alvo)
+        for cor in cores:
+            composta = centralizar(reduzida, alvo, cor)
+            for fmt in formatos:
+                pasta = f"{alvo[0]}x{alvo[1]}/{nome_cor(cor)}/{fmt}"
+                saidas.append((pasta, fmt, codificar(composta, fmt, perfil, max_bytes)))
+    return saidas
+
+
+def converter_variantes_bytes(raw: bytes, alvos, cores, formatos, rapido: bool = True,
+                              perfil: str = PERFIL_PADRAO, max_bytes=None) -> bytes:
+    """Versão serializada de ``converter_variantes`` para o pool de processos."""
+    return pickle.dumps(converter_variantes(raw, alvos, cores, formatos, rapido, perfil, max_bytes))
+
+
+def centralizar_e_codificar(img: Image.Image, target, bg_color, fmt) -> bytes:
+    """Etapa final do pipeline removedor → canvas: uma única codificação."""
+    return codificar(resize_and_center(img, target, bg_color), fmt)
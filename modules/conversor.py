@@ -1,43 +1,17 @@
 import streamlit as st
-from PIL import Image
-import io, os, shutil, zipfile, base64
-from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
-
-def _resize_and_center(img: Image.Image, target_size, bg_color=None):
-    """Redimensiona e centraliza a imagem, opcionalmente com cor de fundo."""
-    w, h = img.size
-    scale = min(target_size[0]/w, target_size[1]/h)
-    new_w, new_h = max(1, int(w*scale)), max(1, int(h*scale))
-    img = img.resize((new_w, new_h), Image.Resampling.LANCZOS)
-
-    # Se bg_color for None → manter transparência
-    if bg_color is None:
-        canvas = Image.new("RGBA", target_size, (0, 0, 0, 0))
-    else:
-        canvas = Image.new("RGB", target_size, bg_color)
-
-    off = ((target_size[0]-new_w)//2, (target_size[1]-new_h)//2)
-    if img.mode != "RGBA":
-        img = img.convert("RGBA")
-    canvas.paste(img, off, img)
-    return canvas
-
+import os
 
-def _play_ping(ping_b64: str):
-    st.markdown(f'<audio autoplay src="data:audio/wav;base64,{ping_b64}"></audio>', unsafe_allow_html=True)
+from modules.assets import tocar_ping, url
+from modules.codificacao import PERFIL_PADRAO, PERFIS, medir_perfis
+from modules.conversao import FORMATOS, abrir_para_alvo, resize_and_center
+from modules.entrada import listar_entradas, salvar_uploads
+from modules.fila_jobs import get_fila
+from modules.jobs_ui import acompanhar, assinatura, botao_download
+from modules.previews import ler_do_zip, miniatura, paginar
+from modules.workspace import workspace_da_sessao
 
 
-def render(ping_b64: str):
-    # ====== Banner ======
-    banner_path = "assets/banner_resize.png"
-    try:
-        with open(banner_path, "rb") as f:
-            b64_banner = base64.b64encode(f.read()).decode("utf-8")
-    except FileNotFoundError:
-        st.error("❌ Imagem de banner não encontrada em 'assets/banner_resize.png'")
-        st.stop()
-
+def render():
     # ====== CSS ======
     st.markdown("""
     <style>
@@ -89,25 +63,71 @@ def render(ping_b64: str):
     <div class="hero-container">
         <div class="hero-title">CONVERSOR DE IMAGEM</div>
         <div class="hero">
-            <img src="data:image/png;base64,{b64_banner}" class="bg" alt="banner">
+            <img src="{url('banner_resize.png')}" class="bg" alt="banner">
         </div>
     </div>
     """, unsafe_allow_html=True)
 
     # ====== Configurações ======
-    col1, col2 = st.columns(2)
-    with col1:
-        target_label = st.radio("Resolução", ("1080x1080", "1080x1920"), horizontal=True)
-        target = (1080, 1080) if target_label == "1080x1080" else (1080, 1920)
-    with col2:
-        usar_cor = st.toggle("Usar cor de fundo personalizada", value=False)
-        bg_rgb = None
-        if usar_cor:
-            hexcor = st.color_picker("Cor de fundo", "#f2f2f2")
-            bg_rgb = tuple(int(hexcor.strip("#")[i:i+2], 16) for i in (0, 2, 4))
-
-    st.write("---")
-    out_format = st.selectbox("Formato de saída", ("png", "jpg", "webp"), index=0)
+    RESOLUCOES = {"1080x1080": (1080, 1080), "1080x1920": (1080, 1920)}
+    fan_out = st.toggle("Várias saídas de uma vez (resoluções × cores × formatos)", value=False)
+    if fan_out:
+        col1, col2 = st.columns(2)
+        with col1:
+            alvos_label = st.multiselect("Resoluções", list(RESOLUCOES), default=list(RESOLUCOES))
+            formatos = st.multiselect("Formatos de saída", FORMATOS, default=list(FORMATOS))
+        with col2:
+            cores = [None] if st.toggle("Incluir fundo transparente", value=True) else []
+            hexcores = st.text_input("Cores de fundo (hex, separadas por vírgula)", placeholder="#ffffff, #f2f2f2")
+            for hexcor in [c.strip().strip("#") for c in hexcores.split(",") if c.strip()]:
+                try:
+                    cores.append(tuple(int(hexcor[i:i+2], 16) for i in (0, 2, 4)))
+                except ValueError:
+                    st.warning(f"Cor inválida ignorada: {hexcor}")
+        alvos = [RESOLUCOES[r] for r in alvos_label]
+        if not (alvos and formatos and cores):
+            st.info("Escolha ao menos uma resolução, uma cor e um formato.")
+            st.stop()
+        target_label = "variantes"
+        out_format = formatos[0]
+    else:
+        col1, col2 = st.columns(2)
+        with col1:
+            target_label = st.radio("Resolução", tuple(RESOLUCOES), horizontal=True)
+            target = RESOLUCOES[target_label]
+        with col2:
+            usar_cor = st.toggle("Usar cor de fundo personalizada", value=False)
+            bg_rgb = None
+            if usar_cor:
+                hexcor = st.color_picker("Cor de fundo", "#f2f2f2")
+                bg_rgb = tuple(int(hexcor.strip("#")[i:i+2], 16) for i in (0, 2, 4))
+
+        st.write("---")
+        out_format = st.selectbox("Formato de saída", FORMATOS, index=0)
+
+    n_cpus = os.cpu_count() or 1
+    col3, col4 = st.columns(2)
+    with col3:
+        execucao = st.radio(
+            "Execução",
+            ("Threads", "Processos"),
+            horizontal=True,
+            help=f"Processos: {n_cpus} workers, escala a codificação (PNG otimizado) em todos os núcleos."
+        )
+    with col4:
+        rapido = st.toggle("Decodificação reduzida (JPEG draft)", value=True, help="Decodifica já perto da resolução final antes do LANCZOS.")
+    col5, col6 = st.columns(2)
+    with col5:
+        deduplicar = st.toggle("Detectar imagens duplicadas", value=True, help="Cada conteúdo é processado uma vez e o resultado vai para todos os caminhos.")
+    with col6:
+        semelhantes = deduplicar and st.toggle("Incluir quase idênticas (hash perceptual)", value=False, help="Trata cópias reencodadas ou redimensionadas como a mesma imagem. Atenção: fotos quase iguais (ex.: variantes de cor do mesmo produto) podem receber o resultado de outra; a cor e a proporção são conferidas, mas revise a saída.")
+
+    with st.expander("⚙️ Codificação", expanded=False):
+        perfil_cod = st.selectbox("Perfil de codificação", list(PERFIS), index=list(PERFIS).index(PERFIL_PADRAO),
+                                  help="rápido: compressão leve · equilibrado · máximo: PNG optimize / JPEG 92 / WebP 95")
+        max_bytes = None
+        if st.toggle("Limitar tamanho por arquivo", value=False, help="Reduz qualidade (JPG/WebP) ou cores (PNG) até caber no limite."):
+            max_bytes = int(st.number_input("Máximo por arquivo (KB)", 50, 20000, 500, 50)) * 1024
 
     # ====== Upload ======
     files = st.file_uploader("Envie imagens ou ZIP", type=["jpg", "jpeg", "png", "webp", "zip"], accept_multiple_files=True)
@@ -115,96 +135,73 @@ def render(ping_b64: str):
         st.info("👆 Envie suas imagens acima para começar.")
         st.stop()
 
-    INP, OUT = "conv_in", "conv_out"
-    shutil.rmtree(INP, ignore_errors=True)
-    shutil.rmtree(OUT, ignore_errors=True)
-    os.makedirs(INP, exist_ok=True)
-    os.makedirs(OUT, exist_ok=True)
-
-    from zipfile import ZipFile, BadZipFile
-    for f in files:
-        if f.name.lower().endswith(".zip"):
-            try:
-                with ZipFile(io.BytesIO(f.read())) as z:
-                    z.extractall(INP)
-            except BadZipFile:
-                st.error(f"ZIP inválido: {f.name}")
-        else:
-            open(os.path.join(INP, f.name), "wb").write(f.read())
-
-    paths = [p for p in Path(INP).rglob("*") if p.suffix.lower() in (".jpg", ".jpeg", ".png", ".webp")]
-    if not paths:
+    # ZIPs são lidos sob demanda pelo diretório central, sem extrair para o disco
+    erros = []
+    entradas = listar_entradas(files, erros)
+    for e in erros:
+        st.error(e)
+
+    if not entradas:
         st.warning("Nenhuma imagem encontrada.")
         st.stop()
 
-    # ====== Processamento ======
-    prog = st.progress(0.0)
-    info = st.empty()
-    results = []
-
-    def worker(p: Path):
-        rel = p.relative_to(INP)
-        raw = open(p, "rb").read()
-        img = Image.open(io.BytesIO(raw)).convert("RGBA")
-        composed = _resize_and_center(img, target, bg_color=bg_rgb)
-        outp = (Path(OUT) / rel).with_suffix("." + out_format.lower())
-        os.makedirs(outp.parent, exist_ok=True)
-
-        bio = io.BytesIO()
-        if out_format.lower() == "jpg":
-            composed.convert("RGB").save(bio, format="JPEG", quality=92, optimize=True)
-        elif out_format.lower() == "png":
-            composed.save(bio, format="PNG", optimize=True)
-        else:
-            composed.save(bio, format="WEBP", quality=95)
-        open(outp, "wb").write(bio.getvalue())
-
-        prev_io = io.BytesIO()
-        pv = composed.copy()
-        pv.thumbnail((360, 360))
-        if out_format.lower() == "jpg":
-            pv.convert("RGB").save(prev_io, format="JPEG", quality=85)
-            mime = "image/jpeg"
-        elif out_format.lower() == "png":
-            pv.save(prev_io, format="PNG")
-            mime = "image/png"
-        else:
-            pv.save(prev_io, format="WEBP", quality=90)
-            mime = "image/webp"
-        return rel.as_posix(), prev_io.getvalue(), mime
-
-    with ThreadPoolExecutor(max_workers=8) as ex:
-        fut = [ex.submit(worker, p) for p in paths]
-        tot = len(fut)
-        for i, f in enumerate(as_completed(fut), 1):
-            try:
-                results.append(f.result())
-            except Exception as e:
-                st.error(f"Erro ao processar: {e}")
-            prog.progress(i / tot)
-            info.info(f"Processado {i}/{tot}")
+    # ====== Comparação de perfis ======
+    with st.expander("📊 Comparar perfis de codificação", expanded=False):
+        n_amostras = st.slider("Imagens de amostra", 1, min(20, len(entradas)), min(5, len(entradas))) if len(entradas) > 1 else 1
+        if st.button("Medir perfis"):
+            alvo_amostra = alvos[0] if fan_out else target
+            cor_amostra = cores[0] if fan_out else bg_rgb
+            imgs = [resize_and_center(abrir_para_alvo(e.ler(), alvo_amostra).convert("RGBA"), alvo_amostra, cor_amostra)
+                    for e in entradas[:n_amostras]]
+            with st.spinner("Codificando amostras..."):
+                st.dataframe(medir_perfis(imgs, formatos if fan_out else [out_format], max_bytes=max_bytes), use_container_width=True)
+
+    # ====== Processamento (fila de jobs) ======
+    params = {
+        "fan_out": fan_out,
+        "alvos": alvos if fan_out else [],
+        "cores": cores if fan_out else [],
+        "formatos": formatos if fan_out else [],
+        "target": None if fan_out else target,
+        "bg_rgb": None if fan_out else bg_rgb,
+        "out_format": out_format,
+        "rapido": rapido,
+        "perfil_cod": perfil_cod,
+        "max_bytes": max_bytes,
+        "execucao": execucao,
+        "deduplicar": deduplicar,
+        "semelhantes": semelhantes,
+    }
+
+    def submeter():
+        # Uploads vão para a pasta do job: o worker não depende desta sessão do navegador
+        ws = workspace_da_sessao(st.session_state)
+        pasta = ws.novo_job("conversor")
+        arquivos = salvar_uploads(files, pasta / "entrada")
+        return get_fila().submeter("conversor", pasta, {**params, "arquivos": arquivos, "limite": ws.restante()}, sessao=ws.id)
+
+    job = acompanhar("conversor", assinatura(files, params), submeter)
+    resultado = job["resultado"]
+    zip_path = resultado["zip"]
+    results = resultado["itens"]
+    for erro in resultado["erros"]:
+        st.error(erro)
+    if resultado["resumo"]:
+        st.info(resultado["resumo"])
 
     st.write("---")
     st.subheader("Pré-visualizações")
+    inicio, fim = paginar(len(results), 6, key="conv_pagina")
     cols = st.columns(3)
-    for idx, (name, data, mime) in enumerate(results[:6]):
+    for idx, (name, arc, k) in enumerate(results[inicio:fim]):
         with cols[idx % 3]:
-            st.image(data, caption=name, use_column_width=True)
-
-    # ====== ZIP ======
-    zbytes = io.BytesIO()
-    with zipfile.ZipFile(zbytes, "w", zipfile.ZIP_DEFLATED) as z:
-        for root, _, files in os.walk(OUT):
-            for fn in files:
-                fp = os.path.join(root, fn)
-                arc = os.path.relpath(fp, OUT)
-                z.write(fp, arc)
-    zbytes.seek(0)
+            st.image(miniatura(("conv", k), ler_do_zip(zip_path, arc)), caption=name, use_column_width=True)
 
     st.success("✅ Conversão concluída!")
-    _play_ping(ping_b64)
-    st.download_button("📦 Baixar imagens convertidas", data=zbytes, file_name=f"convertidas_{target_label}.zip", mime="application/zip")
+    if job["novo"]:
+        tocar_ping()
+    botao_download("📦 Baixar imagens convertidas", zip_path, f"convertidas_{target_label}.zip")
 
 
 if __name__ == "__main__":
-    render("")
+    render()
@@ -0,0 +1,136 @@
+import io
+import threading
+from concurrent.futures import Future
+
+from PIL import Image
+
+# Distância de Hamming máxima entre dHashes para considerar duas imagens iguais
+LIMIAR_SEMELHANTES = 6
+# O dHash só vê gradientes em cinza: variantes de cor da mesma foto também batem.
+# A confirmação exige a mesma proporção e erro médio baixo numa miniatura RGB.
+LIMIAR_COR = 6.0  # erro absoluto médio por canal (0-255)
+TOLERANCIA_PROPORCAO = 0.01
+
+
+def _abrir(raw: bytes, lado: int):
+    img = Image.open(io.BytesIO(raw))
+    if img.format == "JPEG":
+        img.draft("RGB", (lado * 8, lado * 8))
+    return img
+
+
+def _dhash(img: Image.Image, lado: int) -> int:
+    px = img.convert("L").resize((lado + 1, lado), Image.Resampling.BILINEAR).tobytes()
+    bits = 0
+    for y in range(lado):
+        linha = px[y * (lado + 1):(y + 1) * (lado + 1)]
+        for x in range(lado):
+            bits = (bits << 1) | (linha[x] > linha[x + 1])
+    return bits
+
+
+def dhash(raw: bytes, lado: int = 8) -> int:
+    """Hash perceptual (dHash de 64 bits): igual para cópias reencodadas/redimensionadas."""
+    return _dhash(_abrir(raw, lado), lado)
+
+
+def impressao(raw: bytes, lado: int = 8):
+    """``(dhash, proporção, miniatura RGB lado×lado)`` com uma única decodificação."""
+    img = _abrir(raw, lado)
+    w, h = img.size
+    rgb = img.convert("RGB").resize((lado, lado), Image.Resampling.BILINEAR).tobytes()
+    return _dhash(img, lado), w / h, rgb
+
+
+def mesma_cor(a, b) -> bool:
+    """Confirma um par do dHash: mesma proporção e cores próximas na miniatura."""
+    _, prop_a, rgb_a = a
+    _, prop_b, rgb_b = b
+    if abs(prop_a - prop_b) > TOLERANCIA_PROPORCAO * max(prop_a, prop_b):
+        return False
+    return sum(abs(x - y) for x, y in zip(rgb_a, rgb_b)) / len(rgb_a) <= LIMIAR_COR
+
+
+def _faixas(limiar: int, bits: int = 64):
+    """``limiar + 1`` faixas contíguas do hash, como (deslocamento, máscara)."""
+    n = limiar + 1
+    faixas, inicio = [], 0
+    for k in range(n):
+        largura = bits // n + (k < bits % n)
+        faixas.append((inicio, (1 << largura) - 1))
+        inicio += largura
+    return faixas
+
+
+class Deduplicador:
+    """Processa cada conteúdo uma única vez por lote, mesmo com workers concorrentes.
+
+    O primeiro worker que vê um conteúdo calcula o resultado; os demais esperam
+    o mesmo Future e reaproveitam o resultado para o próprio caminho.
+    """
+
+    def __init__(self, perceptual: bool = False, limiar: int = 0):
+        self.perceptual = perceptual
+        self.limiar = limiar
+        self.total = 0
+        self.duplicados = 0
+        self._futuros = {}
+        self._dhashes = []  # (impressão, chave) na ordem de chegada
+        # Índice por faixas do dHash: com limiar+1 faixas, dois hashes a distância <= limiar
+        # têm ao menos uma faixa idêntica (casa dos pombos), então só esses baldes são conferidos
+        self._faixas = _faixas(limiar) if limiar < 64 else None
+        self._indice = [{} for _ in self._faixas or ()]
+        self._lock = threading.Lock()
+
+    def _chave(self, raw: bytes, h: str):
+        if not self.perceptual:
+            return h
+        try:
+            imp = impressao(raw)
+        except Exception:
+            return h
+        d = imp[0]
+        with self._lock:
+            if self._faixas is None:
+                candidatas = range(len(self._dhashes))
+            else:
+                candidatas = sorted({i for idx, (desloc, mascara) in zip(self._indice, self._faixas)
+                                     for i in idx.get((d >> desloc) & mascara, ())})
+            for i in candidatas:
+                outra, chave = self._dhashes[i]
+                if bin(outra[0] ^ d).count("1") <= self.limiar and mesma_cor(outra, imp):
+                    return chave
+            i = len(self._dhashes)
+            chave = ("dhash", d, i)
+            self._dhashes.append((imp, chave))
+            for idx, (desloc, mascara) in zip(self._indice, self._faixas or ()):
+                idx.setdefault((d >> desloc) & mascara, []).append(i)
+        return chave
+
+    def resolver(self, raw: bytes, h: str, calcular):
+        """Devolve ``(resultado, duplicado)``; ``calcular()`` só roda para conteúdo inédito."""
+        chave = self._chave(raw, h)
+        with self._lock:
+            self.total += 1
+            fut = self._futuros.get(chave)
+            dono = fut is None
+            if dono:
+                fut = self._futuros[chave] = Future()
+            else:
+                self.duplicados += 1
+        if not dono:
+            return fut.result(), True
+        try:
+            resultado = calcular()
+        except Exception as e:
+            fut.set_exception(e)
+            raise
+        fut.set_result(resultado)
+        return resultado, False
+
+    def resumo(self) -> str:
+        if not self.duplicados:
+            return f"Nenhuma duplicada em {self.total} imagens."
+        pct = 100 * self.duplicados / max(1, self.total)
+        return (f"♻️ {self.duplicados} de {self.total} imagens eram duplicadas — "
+                f"{self.total - self.duplicados} processadas ({pct:.0f}% do trabalho evitado).")
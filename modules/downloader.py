@@ -0,0 +1,190 @@
+import csv
+import hashlib
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from modules.pool_processos import executar_em_janela
+
+# ============== Configuração ==============
+WORKERS = int(os.environ.get("V2_DOWNLOAD_WORKERS", "32"))
+POR_HOST = int(os.environ.get("V2_DOWNLOAD_POR_HOST", "16"))
+TENTATIVAS = int(os.environ.get("V2_DOWNLOAD_TENTATIVAS", "5"))
+TIMEOUT = float(os.environ.get("V2_DOWNLOAD_TIMEOUT_S", "20"))
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+BLOCO = 256 * 1024
+
+# Respostas que valem nova tentativa (throttling e falhas transitórias do servidor)
+REPETIR = {408, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class ResultadoDownload:
+    url: str
+    destino: str
+    ok: bool
+    status: int = 0
+    bytes: int = 0
+    tentativas: int = 0
+    ms: float = 0.0
+    erro: str = ""
+    etag: str = ""
+    last_modified: str = ""
+    sha256: str = ""
+    # Corpo da resposta quando baixado para a memória (fica fora do relatório)
+    conteudo: bytes = field(default=None, repr=False)
+
+
+def espera_retry_after(valor, padrao: float) -> float:
+    """Segundos pedidos por um cabeçalho Retry-After (número ou data HTTP)."""
+    if not valor:
+        return padrao
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return padrao
+
+
+def backoff(tentativa: int) -> float:
+    """Espera exponencial com jitter (full jitter) para a tentativa ``tentativa`` (base 1)."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (tentativa - 1)))
+
+
+def criar_sessao(conexoes: int = WORKERS) -> requests.Session:
+    """Session com pool de conexões (keep-alive): um handshake TLS por conexão, não por arquivo."""
+    s = requests.Session()
+    adapter = HTTPAdapter(pool_connections=conexoes, pool_maxsize=conexoes)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+
+class Downloader:
+    """Baixa URLs em paralelo numa Session compartilhada, com limite por host e retentativas.
+
+    Cada arquivo é gravado em streaming num ``.parcial`` e só renomeado no fim, então
+    uma falha nunca deixa arquivo truncado no lugar; toda URL gera um ``ResultadoDownload``.
+    Com ``cabecalhos`` condicionais (``If-None-Match``/``If-Modified-Since``), um 304
+    conta como sucesso e mantém o arquivo que já está em ``destino``. Com ``destino``
+    None o corpo fica em ``ResultadoDownload.conteudo``, sem passar pelo disco.
+    """
+
+    def __init__(self, workers=WORKERS, por_host=POR_HOST, tentativas=TENTATIVAS, timeout=TIMEOUT, sessao=None):
+        self.workers = max(1, workers)
+        self.por_host = max(1, por_host)
+        self.tentativas = max(1, tentativas)
+        self.timeout = timeout
+        self.sessao = sessao or criar_sessao(self.workers)
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _semaforo(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.por_host)
+            return self._hosts[host]
+
+    def baixar(self, url: str, destino=None, cabecalhos=None) -> ResultadoDownload:
+        res = ResultadoDownload(url, destino or "", ok=False)
+        t0 = time.perf_counter()
+        # Um .parcial por thread: dois jobs podem atualizar a mesma imagem do catálogo
+        parcial = destino and f"{destino}.{threading.get_ident()}.parcial"
+        for tentativa in range(1, self.tentativas + 1):
+            res.tentativas = tentativa
+            espera = None
+            try:
+                with self._semaforo(url):
+                    with self.sessao.get(url, headers=cabecalhos, stream=True, timeout=self.timeout) as r:
+                        res.status = r.status_code
+                        res.etag = r.headers.get("ETag", "")
+                        res.last_modified = r.headers.get("Last-Modified", "")
+                        if r.status_code == 304 and cabecalhos and destino and os.path.exists(destino):
+                            res.ok, res.erro = True, ""
+                            break
+                        if r.status_code == 200 and destino is None:
+                            res.conteudo = r.content
+                            res.ok, res.bytes, res.sha256, res.erro = True, len(res.conteudo), hashlib.sha256(res.conteudo).hexdigest(), ""
+                            break
+                        if r.status_code == 200:
+                            os.makedirs(os.path.dirname(destino) or ".", exist_ok=True)
+                            n, h = 0, hashlib.sha256()
+                            with open(parcial, "wb") as f:
+                                for bloco in r.iter_content(BLOCO):
+                                    f.write(bloco)
+                                    h.update(bloco)
+                                    n += len(bloco)
+                            os.replace(parcial, destino)
+                            res.ok, res.bytes, res.sha256, res.erro = True, n, h.hexdigest(), ""
+                            break
+                        res.erro = f"HTTP {r.status_code}"
+                        if r.status_code not in REPETIR:
+                            break
+                        espera = espera_retry_after(r.headers.get("Retry-After"), backoff(tentativa))
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                res.erro = f"{type(e).__name__}: {e}"
+            except (requests.RequestException, OSError) as e:
+                res.erro = f"{type(e).__name__}: {e}"
+                break
+            finally:
+                if not res.ok and parcial and os.path.exists(parcial):
+                    os.remove(parcial)
+            if tentativa < self.tentativas:
+                time.sleep(backoff(tentativa) if espera is None else espera)
+        res.ms = round((time.perf_counter() - t0) * 1000, 1)
+        return res
+
+    def baixar_todos(self, tarefas, progresso=None, ao_terminar=None, processar=None):
+        """``tarefas``: iterável de ``(url, destino)`` ou ``(url, destino, cabecalhos)``;
+        pode ser um gerador, consumido conforme os downloads terminam (os downloads
+        começam antes da listagem acabar). ``ao_terminar(resultado)`` é chamado a cada
+        download concluído, na thread de quem chamou. ``processar(resultado)`` roda na
+        thread do download logo após cada sucesso (ex.: converter o ``conteudo`` em
+        memória), que em seguida é descartado.
+        """
+        total = len(tarefas) if hasattr(tarefas, "__len__") else None
+
+        def executar(t):
+            res = self.baixar(*t)
+            if processar is not None:
+                if res.ok:
+                    try:
+                        processar(res)
+                    except Exception as e:
+                        res.ok, res.erro = False, f"{type(e).__name__}: {e}"
+                res.conteudo = None
+            return res
+
+        resultados = []
+        with ThreadPoolExecutor(max_workers=self.workers) as ex:
+            for f in executar_em_janela(ex, executar, tarefas, self.workers * 2):
+                resultados.append(f.result())
+                if ao_terminar is not None:
+                    ao_terminar(resultados[-1])
+                if progresso is not None:
+                    n = len(resultados)
+                    progresso(n, total or n + 1, f"Baixando imagens {n}/{total}" if total else f"Baixando imagens: {n}")
+        return resultados
+
+
+def gravar_relatorio(resultados, caminho: str):
+    """Relatório por URL em CSV (uma linha por download)."""
+    campos = [c for c in ResultadoDownload.__dataclass_fields__ if c != "conteudo"]
+    with open(caminho, "w", newline="", encoding="utf-8-sig") as f:
+        w = csv.DictWriter(f, fieldnames=campos, extrasaction="ignore")
+        w.writeheader()
+        for r in resultados:
+            w.writerow(asdict(r))
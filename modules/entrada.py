@@ -0,0 +1,118 @@
+import hashlib
+import os
+import shutil
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import Callable
+
+EXTENSOES = (".jpg", ".jpeg", ".png", ".webp")
+
+
+@dataclass(frozen=True)
+class Entrada:
+    """Imagem de entrada: caminho relativo no lote e leitura preguiçosa dos bytes."""
+
+    rel: str
+    ler: Callable[[], bytes]
+
+
+class ArquivoLocal:
+    """Upload já gravado em disco, com a mesma interface do UploadedFile usada aqui."""
+
+    def __init__(self, caminho, name: str):
+        self.caminho = str(caminho)
+        self.name = name
+
+    def getvalue(self) -> bytes:
+        return Path(self.caminho).read_bytes()
+
+
+def salvar_uploads(files, pasta):
+    """Grava os uploads na pasta do job; devolve ``[caminho, nome]`` para os workers."""
+    pasta = Path(pasta)
+    pasta.mkdir(parents=True, exist_ok=True)
+    salvos = []
+    for i, f in enumerate(files):
+        destino = pasta / f"{i:04d}{PurePosixPath(f.name).suffix.lower()}"
+        f.seek(0)
+        with open(destino, "wb") as out:
+            shutil.copyfileobj(f, out)
+        salvos.append([str(destino), f.name])
+    return salvos
+
+
+def _rel_seguro(nome: str) -> str:
+    """Normaliza o caminho do membro (sem '..' nem barra inicial), como o extractall fazia."""
+    partes = [p for p in PurePosixPath(nome.replace("\\", "/")).parts if p not in ("", ".", "..", "/")]
+    return "/".join(partes)
+
+
+def _e_imagem(nome: str) -> bool:
+    return PurePosixPath(nome).suffix.lower() in EXTENSOES and not nome.startswith("__MACOSX/")
+
+
+def listar_entradas(files, erros=None):
+    """Lista as imagens dos arquivos enviados sem extrair nada para o disco.
+
+    ZIPs são filtrados pelo diretório central; cada membro só é descomprimido
+    quando o worker chama ``entrada.ler()``. O ``ZipFile`` é compartilhado entre
+    threads (a leitura de membros diferentes é segura).
+    """
+    entradas = []
+    for f in files:
+        if f.name.lower().endswith(".zip"):
+            try:
+                z = zipfile.ZipFile(getattr(f, "caminho", f))
+            except zipfile.BadZipFile:
+                if erros is not None:
+                    erros.append(f"ZIP inválido: {f.name}")
+                continue
+            for info in z.infolist():
+                if info.is_dir() or not _e_imagem(info.filename):
+                    continue
+                rel = _rel_seguro(info.filename)
+                if rel:
+                    entradas.append(Entrada(rel, lambda z=z, info=info: z.read(info)))
+        elif _e_imagem(f.name):
+            entradas.append(Entrada(_rel_seguro(f.name), f.getvalue))
+    return entradas
+
+
+def arquivos_locais(caminhos, erros=None):
+    """Diretórios (recursivos), ZIPs e imagens do disco como ``ArquivoLocal``.
+
+    Dentro de um diretório o nome guarda o caminho relativo a ele, que vira a
+    estrutura de pastas da saída. Arquivos avulsos (argumentos ou lista do stdin)
+    guardam o caminho relativo à raiz comum entre eles, então ``p1/1.jpg`` e
+    ``p2/1.jpg`` não colidem no ZIP nem na fatia do ``--shard``.
+    """
+    arquivos = []
+    avulsos = []
+    for caminho in caminhos:
+        caminho = Path(caminho)
+        if caminho.is_dir():
+            for raiz, dirs, nomes in os.walk(caminho):
+                dirs.sort()
+                for nome in sorted(nomes):
+                    p = Path(raiz, nome)
+                    arquivos.append(ArquivoLocal(p, p.relative_to(caminho).as_posix()))
+        elif caminho.is_file():
+            avulsos.append((len(arquivos), caminho))
+            arquivos.append(None)
+        elif erros is not None:
+            erros.append(f"Arquivo não encontrado: {caminho}")
+    if avulsos:
+        raiz = os.path.commonpath([str(c.resolve().parent) for _, c in avulsos])
+        for i, caminho in avulsos:
+            rel = _rel_seguro(os.path.relpath(caminho.resolve(), raiz).replace(os.sep, "/"))
+            arquivos[i] = ArquivoLocal(caminho, rel or caminho.name)
+    return arquivos
+
+
+def fatiar(entradas, indice: int, total: int):
+    """Fatia ``indice`` de ``total`` (base 0), estável entre máquinas: decide pelo hash do caminho."""
+    if total <= 1:
+        return list(entradas)
+    return [e for e in entradas
+            if int.from_bytes(hashlib.sha1(e.rel.encode()).digest()[:8], "big") % total == indice]
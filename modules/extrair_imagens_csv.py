@@ -1,11 +1,10 @@
 import streamlit as st
-import requests
-import pandas as pd
-import re
-import os
-import shutil
-import zipfile
-import concurrent.futures
+import uuid
+
+from modules.conversao import FORMATOS
+from modules.fila_jobs import get_fila
+from modules.jobs_ui import acompanhar, botao_download
+from modules.workspace import workspace_da_sessao
 
 # ============== Helpers ==============
 def _header():
@@ -44,79 +43,8 @@ def _header():
     """, unsafe_allow_html=True)
 
 
-def _shopify_request(url, token, params=None):
-    headers = {
-        "X-Shopify-Access-Token": token,
-        "Content-Type": "application/json",
-    }
-    r = requests.get(url, headers=headers, params=params, timeout=60)
-    if r.status_code != 200:
-        try:
-            st.error(f"Erro {r.status_code}: {r.json()}")
-        except Exception:
-            st.error(f"Erro {r.status_code}: {r.text[:300]}")
-        st.stop()
-    return r
-
-
-def _get_collection_id(shop_name, api_version, collection_input, token):
-    # Se for ID direto
-    if collection_input.isdigit():
-        return collection_input
-
-    # Se for URL
-    if collection_input.startswith("http"):
-        m = re.search(r"/collections/([^/?#]+)", collection_input)
-        if m:
-            handle = m.group(1)
-        else:
-            st.error("URL de coleção inválida."); st.stop()
-    else:
-        handle = collection_input
-
-    # Buscar coleção pelo handle
-    url = f"https://{shop_name}.myshopify.com/admin/api/{api_version}/custom_collections.json"
-    r = _shopify_request(url, token, params={"handle": handle})
-    items = r.json().get("custom_collections", [])
-    if not items:
-        st.error("Coleção não encontrada pelo handle informado."); st.stop()
-    return str(items[0]["id"])
-
-
-def _get_products_in_collection(shop_name, api_version, collection_id, token):
-    produtos = []
-    page_info = None
-    while True:
-        url = f"https://{shop_name}.myshopify.com/admin/api/{api_version}/products.json"
-        params = {"collection_id": collection_id, "limit": 250}
-        if page_info:
-            params["page_info"] = page_info
-        r = _shopify_request(url, token, params=params)
-        produtos.extend(r.json().get("products", []))
-        link = r.headers.get("link", "")
-        if link and 'rel="next"' in link:
-            try:
-                page_info = link.split("page_info=")[-1].split(">")[0]
-            except Exception:
-                break
-        else:
-            break
-    return produtos
-
-
-def _baixar_imagem(url, caminho):
-    try:
-        r = requests.get(url, timeout=20)
-        if r.status_code == 200:
-            os.makedirs(os.path.dirname(caminho), exist_ok=True)
-            with open(caminho, "wb") as f:
-                f.write(r.content)
-    except Exception:
-        pass
-
-
 # ============== Interface ==============
-def render(ping_b64: str):
+def render():
     _header()
 
     st.markdown("### Configuração de Acesso")
@@ -133,65 +61,86 @@ def render(ping_b64: str):
     st.markdown("### Opções")
     modo = st.radio("Selecione a ação:", ("🔗 Gerar apenas CSV com links", "📦 Baixar imagens e gerar ZIP por produto"), index=0, horizontal=True)
     turbo = st.toggle("Turbo (download paralelo)", value=True)
+    MODOS_API = {"Automático": "auto", "REST (campos mínimos)": "rest", "Bulk Operation (GraphQL)": "bulk"}
+    modo_api = MODOS_API[st.radio(
+        "Listagem dos produtos", tuple(MODOS_API), horizontal=True,
+        help="Automático usa a Bulk Operation do GraphQL em coleções grandes e a REST nas pequenas."
+    )]
+    largura_cdn = conversao = None
+    if "📦" in modo:
+        RESOLUCOES = {"1080x1080": (1080, 1080), "1080x1920": (1080, 1920)}
+        converter = st.toggle("Converter no download", value=False,
+                              help="Cada imagem baixada já sai centralizada e codificada no ZIP, sem passar pelo conversor.")
+        if converter:
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                target = RESOLUCOES[st.radio("Resolução", tuple(RESOLUCOES), horizontal=True)]
+            with col2:
+                bg_rgb = None
+                if st.toggle("Usar cor de fundo personalizada", value=False):
+                    hexcor = st.color_picker("Cor de fundo", "#f2f2f2")
+                    bg_rgb = tuple(int(hexcor.strip("#")[i:i+2], 16) for i in (0, 2, 4))
+            with col3:
+                formato = st.selectbox("Formato de saída", FORMATOS, index=FORMATOS.index("jpg"))
+            conversao = [target, bg_rgb, formato]
+        if st.toggle("Redimensionar na CDN da Shopify", value=converter,
+                      help="Pede cada imagem já na largura informada (parâmetro width da CDN): menos banda e menos decodificação."):
+            largura_cdn = int(st.number_input("Largura pedida à CDN (px)", 100, 5760, target[0] if converter else 1080, 10))
     st.write("---")
 
     if st.button("▶️ Iniciar Exportação", use_container_width=True):
         if not (shop_name and api_version and access_token and collection_input):
             st.warning("Preencha todos os campos obrigatórios.")
             st.stop()
+        # Cada clique é um pedido novo; reexecuções só voltam a acompanhar o job
+        st.session_state["extrator_pedido"] = uuid.uuid4().hex
 
-        # Limpa pastas antigas
-        if os.path.exists("imagens_baixadas"):
-            shutil.rmtree("imagens_baixadas")
-        for file in os.listdir():
-            if file.endswith(".zip") or file.endswith(".csv"):
-                os.remove(file)
+    pedido = st.session_state.get("extrator_pedido")
+    if pedido is None:
+        st.stop()
 
-        collection_id = _get_collection_id(shop_name, api_version, collection_input, access_token)
-        produtos = _get_products_in_collection(shop_name, api_version, collection_id, access_token)
+    def submeter():
+        # Pasta isolada deste job (substitui o job anterior desta sessão)
+        ws = workspace_da_sessao(st.session_state)
+        pasta = ws.novo_job("extrator")
+        params = {
+            "shop_name": shop_name,
+            "api_version": api_version,
+            "collection_input": collection_input,
+            "baixar": "📦" in modo,
+            "turbo": turbo,
+            "modo_api": modo_api,
+            "largura_cdn": largura_cdn,
+            "conversao": conversao,
+            "limite": ws.restante(),
+        }
+        # O token fica só na memória deste processo, nunca no banco de jobs
+        return get_fila().submeter("extrator", pasta, params, sessao=ws.id, segredos={"access_token": access_token})
+
+    job = acompanhar("extrator", pedido, submeter)
+    resultado = job["resultado"]
+    if not resultado["produtos"]:
+        st.warning("Nenhum produto encontrado nesta coleção.")
+        st.stop()
 
-        if not produtos:
-            st.warning("Nenhum produto encontrado nesta coleção.")
-            st.stop()
+    if resultado.get("relatorio"):
+        inalteradas = f" e {resultado['inalteradas']} sem alteração desde a última exportação" if resultado["inalteradas"] else ""
+        if resultado["n_falhas"]:
+            st.warning(f"⚠️ {resultado['baixadas']} de {resultado['imagens']} imagens baixadas{inalteradas}; {resultado['n_falhas']} falharam.")
+            st.dataframe([{"URL": url, "Erro": erro} for url, erro in resultado["falhas"]], use_container_width=True)
+        else:
+            st.info(f"{resultado['baixadas']} imagens baixadas{inalteradas}.")
+        with open(resultado["relatorio"], "rb") as f:
+            st.download_button("📄 Relatório de downloads", f, file_name="relatorio_downloads.csv", use_container_width=True)
+
+    if resultado["zip"]:
+        botao_download("📥 Baixar ZIP", resultado["zip"], resultado["zip_nome"])
+
+    with open(resultado["csv"], "rb") as f:
+        st.download_button("📥 Baixar CSV", f, file_name=resultado["csv_nome"], use_container_width=True)
 
-        dados, tarefas = [], []
-        for p in produtos:
-            title = p.get("title", "")
-            imagens = [img["src"] for img in p.get("images", [])]
-            item = {"Título": title}
-            for i, img in enumerate(imagens):
-                item[f"Imagem {i+1}"] = img
-                if "📦" in modo:
-                    pasta = os.path.join("imagens_baixadas", re.sub(r'[\\/*?:\"<>|]', "_", title))
-                    tarefas.append((img, os.path.join(pasta, f"{i+1}.jpg")))
-            dados.append(item)
-
-        if "📦" in modo and tarefas:
-            st.info(f"Baixando {len(tarefas)} imagens...")
-            if turbo:
-                with concurrent.futures.ThreadPoolExecutor(max_workers=16) as ex:
-                    list(ex.map(lambda x: _baixar_imagem(*x), tarefas))
-            else:
-                for t in tarefas:
-                    _baixar_imagem(*t)
-
-            zip_name = f"imagens_colecao_{collection_id}.zip"
-            with zipfile.ZipFile(zip_name, "w", zipfile.ZIP_DEFLATED) as zipf:
-                for root, _, files in os.walk("imagens_baixadas"):
-                    for file in files:
-                        path = os.path.join(root, file)
-                        zipf.write(path, os.path.relpath(path, "imagens_baixadas"))
-
-            with open(zip_name, "rb") as f:
-                st.download_button("📥 Baixar ZIP", f, file_name=zip_name, use_container_width=True)
-
-        csv_name = f"imagens_colecao_{collection_id}.csv"
-        pd.DataFrame(dados).to_csv(csv_name, index=False, encoding="utf-8-sig")
-        with open(csv_name, "rb") as f:
-            st.download_button("📥 Baixar CSV", f, file_name=csv_name, use_container_width=True)
-
-        st.success("🎉 Exportação concluída!")
+    st.success("🎉 Exportação concluída!")
 
 
 if __name__ == "__main__":
-    render("")
+    render()
@@ -0,0 +1,318 @@
+"""Fila local de jobs com SQLite como broker.
+
+As páginas só submetem o job e acompanham o progresso pelo id; o trabalho roda
+em workers por ferramenta (threads deste processo ou ``python -m modules.fila_jobs``
+em outro processo), então reexecuções, troca de aba e queda do navegador não o
+interrompem. Cada ferramenta tem seu limite de jobs simultâneos.
+"""
+import importlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from pathlib import Path
+
+from modules.workspace import BASE, manter_vivo
+
+# ============== Configuração ==============
+DB = Path(os.environ.get("V2_JOBS_DB", str(BASE / "jobs.sqlite3")))
+LIMITES = {
+    "removedor": int(os.environ.get("V2_JOBS_REMOVEDOR", "2")),
+    "conversor": int(os.environ.get("V2_JOBS_CONVERSOR", "6")),
+    "extrator": int(os.environ.get("V2_JOBS_EXTRATOR", "3")),
+}
+# 0 = este processo só roda jobs que exigem segredos em memória; o resto fica para o worker externo
+WORKERS_LOCAIS = os.environ.get("V2_JOBS_LOCAL", "1") != "0"
+INTERVALO = 0.5
+RETENCAO = 7 * 24 * 3600  # jobs finalizados somem do banco depois disso
+
+TAREFAS = {
+    "conversor": "modules.tarefas:converter_lote",
+    "removedor": "modules.tarefas:remover_lote",
+    "extrator": "modules.tarefas:exportar_colecao",
+}
+
+NA_FILA, RODANDO, CONCLUIDO, ERRO, CANCELADO = "na_fila", "rodando", "concluido", "erro", "cancelado"
+FINAIS = (CONCLUIDO, ERRO, CANCELADO)
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    ferramenta TEXT NOT NULL,
+    sessao TEXT,
+    estado TEXT NOT NULL,
+    local INTEGER NOT NULL DEFAULT 0,
+    dono TEXT,
+    pasta TEXT NOT NULL,
+    params TEXT NOT NULL,
+    feitos INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    mensagem TEXT NOT NULL DEFAULT '',
+    resultado TEXT,
+    erro TEXT,
+    cancelar INTEGER NOT NULL DEFAULT 0,
+    criado_em REAL NOT NULL,
+    atualizado_em REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_fila ON jobs (ferramenta, estado, criado_em);
+"""
+
+
+class JobCancelado(Exception):
+    pass
+
+
+def _dono() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _vivo(dono: str) -> bool:
+    # ``host:pid`` ou, para quem submeteu um job local, ``host:pid/fila``
+    host, _, pid = (dono or "").split("/")[0].rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return True  # outra máquina: não há como saber
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+class Broker:
+    """Acesso à tabela de jobs (uma conexão por processo, serializada por lock)."""
+
+    def __init__(self, caminho: Path = DB):
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(caminho), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_ESQUEMA)
+
+    def _exec(self, sql, args=()):
+        with self._lock:
+            return self._conn.execute(sql, args)
+
+    def submeter(self, ferramenta, pasta, params, sessao=None, local=False, dono=None) -> str:
+        """``local``: o job exige segredos em memória e só ``dono`` (quem submeteu) pode rodá-lo."""
+        id_ = uuid.uuid4().hex
+        agora = time.time()
+        self._exec(
+            "INSERT INTO jobs (id, ferramenta, sessao, estado, local, dono, pasta, params, criado_em, atualizado_em) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (id_, ferramenta, sessao, NA_FILA, int(local), dono, str(pasta), json.dumps(params), agora, agora),
+        )
+        return id_
+
+    def reivindicar(self, ferramenta, local=None, dono=None):
+        """Passa o job mais antigo da fila para 'rodando' de forma atômica (ou None).
+
+        ``local`` filtra jobs que exigem segredos em memória (True), os que não
+        exigem (False) ou aceita ambos (None). Jobs locais só são reivindicados
+        pelo ``dono`` que os submeteu: outro processo no mesmo banco não tem os segredos.
+        """
+        filtro, args = "", [ferramenta, NA_FILA]
+        if local is False:
+            filtro = " AND local = 0"
+        else:
+            filtro = " AND local = 1 AND dono = ?" if local else " AND (local = 0 OR dono = ?)"
+            args.append(dono)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"SELECT * FROM jobs WHERE ferramenta = ? AND estado = ?{filtro} ORDER BY criado_em LIMIT 1",
+                    args,
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET estado = ?, dono = ?, atualizado_em = ? WHERE id = ?",
+                        (RODANDO, _dono(), time.time(), row["id"]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row
+
+    def progresso(self, id_, feitos, total, mensagem=""):
+        self._exec(
+            "UPDATE jobs SET feitos = ?, total = ?, mensagem = ?, atualizado_em = ? WHERE id = ?",
+            (feitos, total, mensagem, time.time(), id_),
+        )
+
+    def finalizar(self, id_, estado, resultado=None, erro=None):
+        self._exec(
+            "UPDATE jobs SET estado = ?, resultado = ?, erro = ?, atualizado_em = ? WHERE id = ?",
+            (estado, None if resultado is None else json.dumps(resultado), erro, time.time(), id_),
+        )
+
+    def cancelar(self, id_):
+        """Jobs na fila são cancelados na hora; os que estão rodando param no próximo progresso."""
+        agora = time.time()
+        self._exec("UPDATE jobs SET estado = ?, atualizado_em = ? WHERE id = ? AND estado = ?", (CANCELADO, agora, id_, NA_FILA))
+        self._exec("UPDATE jobs SET cancelar = 1, atualizado_em = ? WHERE id = ? AND estado = ?", (agora, id_, RODANDO))
+
+    def cancelado(self, id_) -> bool:
+        row = self._exec("SELECT cancelar FROM jobs WHERE id = ?", (id_,)).fetchone()
+        return row is None or bool(row["cancelar"])
+
+    def status(self, id_):
+        row = self._exec("SELECT * FROM jobs WHERE id = ?", (id_,)).fetchone()
+        if row is None:
+            return None
+        st_ = dict(row)
+        st_["params"] = json.loads(st_["params"])
+        st_["resultado"] = json.loads(st_["resultado"]) if st_["resultado"] else None
+        return st_
+
+    def recuperar_orfaos(self):
+        """Jobs 'rodando' de processos que morreram voltam como erro, assim como jobs
+        locais na fila cujo processo (o único com os segredos) morreu."""
+        for row in self._exec("SELECT id, dono FROM jobs WHERE estado = ?", (RODANDO,)).fetchall():
+            if not _vivo(row["dono"]):
+                self.finalizar(row["id"], ERRO, erro="Interrompido: o processo do worker foi encerrado.")
+        for row in self._exec("SELECT id, dono FROM jobs WHERE estado = ? AND local = 1", (NA_FILA,)).fetchall():
+            if not _vivo(row["dono"]):
+                self.finalizar(row["id"], ERRO, erro="Interrompido: o processo que submeteu o job foi encerrado.")
+
+    def limpar(self, idade: float):
+        self._exec("DELETE FROM jobs WHERE estado IN (?, ?, ?) AND atualizado_em < ?", (*FINAIS, time.time() - idade))
+
+
+class Progresso:
+    """Callback entregue às tarefas: grava o avanço (com intervalo mínimo) e checa cancelamento."""
+
+    def __init__(self, broker: Broker, id_: str, intervalo: float = INTERVALO, pasta=None):
+        self.broker = broker
+        self.id = id_
+        self.intervalo = intervalo
+        self.pasta = pasta
+        self._ultimo = 0.0
+        self._tocado = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, feitos: int, total: int, mensagem: str = ""):
+        agora = time.monotonic()
+        with self._lock:
+            if feitos < total and agora - self._ultimo < self.intervalo:
+                return
+            self._ultimo = agora
+            # Job longo: a limpeza por TTL não pode apagar a pasta enquanto ele grava
+            tocar = self.pasta is not None and agora - self._tocado > 60
+            if tocar:
+                self._tocado = agora
+        if tocar:
+            manter_vivo(self.pasta)
+        if self.broker.cancelado(self.id):
+            raise JobCancelado()
+        self.broker.progresso(self.id, feitos, total, mensagem)
+
+
+def _resolver(ferramenta):
+    modulo, _, nome = TAREFAS[ferramenta].partition(":")
+    return getattr(importlib.import_module(modulo), nome)
+
+
+class Fila:
+    """Workers por ferramenta (threads) que consomem a tabela de jobs."""
+
+    def __init__(self, broker: Broker, limites=None, local=None):
+        self.broker = broker
+        self.limites = dict(LIMITES if limites is None else limites)
+        self.local = local
+        # Segredos (ex.: token da Shopify) nunca vão para o SQLite: ficam só em memória,
+        # e os jobs que dependem deles ficam marcados com o id desta fila
+        self.id = f"{_dono()}/{uuid.uuid4().hex[:8]}"
+        self._segredos = {}
+        self._avisos = {f: threading.Event() for f in self.limites}
+        self._threads = []
+
+    def iniciar(self):
+        self.broker.recuperar_orfaos()
+        self.broker.limpar(RETENCAO)
+        for ferramenta, n in self.limites.items():
+            for i in range(max(0, n)):
+                t = threading.Thread(target=self._loop, args=(ferramenta,), name=f"job-{ferramenta}-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+        return self
+
+    def submeter(self, ferramenta, pasta, params, sessao=None, segredos=None) -> str:
+        id_ = self.broker.submeter(ferramenta, pasta, params, sessao, local=bool(segredos), dono=self.id)
+        if segredos:
+            self._segredos[id_] = segredos
+        if ferramenta in self._avisos:
+            self._avisos[ferramenta].set()
+        return id_
+
+    def status(self, id_):
+        return self.broker.status(id_)
+
+    def cancelar(self, id_):
+        self.broker.cancelar(id_)
+        self._segredos.pop(id_, None)
+
+    def _loop(self, ferramenta):
+        aviso = self._avisos[ferramenta]
+        while True:
+            row = self.broker.reivindicar(ferramenta, self.local, self.id)
+            if row is None:
+                aviso.wait(INTERVALO * 4)
+                aviso.clear()
+                continue
+            self._executar(row)
+
+    def _executar(self, row):
+        id_ = row["id"]
+        params = json.loads(row["params"])
+        segredos = self._segredos.pop(id_, None)
+        if row["local"] and segredos is None:
+            self.broker.finalizar(id_, ERRO, erro="Job exige credenciais que não estão neste processo.")
+            return
+        progresso = Progresso(self.broker, id_, pasta=row["pasta"])
+        try:
+            resultado = _resolver(row["ferramenta"])(Path(row["pasta"]), {**params, **(segredos or {})}, progresso)
+        except JobCancelado:
+            self.broker.finalizar(id_, CANCELADO)
+        except Exception as e:
+            traceback.print_exc()
+            self.broker.finalizar(id_, ERRO, erro=str(e) or type(e).__name__)
+        else:
+            self.broker.finalizar(id_, CONCLUIDO, resultado=resultado)
+
+
+_fila = None
+_fila_lock = threading.Lock()
+
+
+def get_fila() -> Fila:
+    """Fila do processo do app; com V2_JOBS_LOCAL=0 só roda aqui o que exige segredos."""
+    global _fila
+    with _fila_lock:
+        if _fila is None:
+            _fila = Fila(Broker(), local=None if WORKERS_LOCAIS else True).iniciar()
+        return _fila
+
+
+def main():
+    """Worker externo: ``python -m modules.fila_jobs``."""
+    broker = Broker()
+    # Jobs com segredos em memória só podem rodar no processo que os submeteu
+    fila = Fila(broker, local=False).iniciar()
+    print(f"Worker de jobs em {DB} — limites: {fila.limites}", flush=True)
+    while True:
+        time.sleep(3600)
+        broker.limpar(RETENCAO)
+
+
+if __name__ == "__main__":
+    main()
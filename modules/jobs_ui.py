@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import time
+
+import streamlit as st
+
+from modules.fila_jobs import CANCELADO, CONCLUIDO, FINAIS, INTERVALO, get_fila
+from modules.workspace import manter_vivo
+
+
+def assinatura(files, params) -> str:
+    """Identifica um pedido (uploads + parâmetros): mudou, vira um job novo."""
+    h = hashlib.sha256()
+    for f in files or ():
+        h.update(f"{f.name}|{getattr(f, 'size', '')}|".encode())
+        # Reenviar um arquivo editado com o mesmo nome e tamanho também é pedido novo:
+        # cada upload ganha um file_id próprio (sem ele, vale o hash do conteúdo)
+        file_id = getattr(f, "file_id", None)
+        h.update(f"{file_id}|".encode() if file_id else hashlib.sha256(f.getvalue()).digest())
+    h.update(json.dumps(params, sort_keys=True, default=repr).encode())
+    return h.hexdigest()
+
+
+def acompanhar(ferramenta: str, assinatura_: str, submeter):
+    """Mostra o progresso do job da página e devolve o status final.
+
+    ``submeter()`` só é chamado se a sessão ainda não tem job com esta assinatura;
+    um job anterior com outra assinatura é cancelado. Reexecuções apenas voltam
+    a acompanhar o mesmo job, que continua rodando nos workers da fila.
+    """
+    fila = get_fila()
+    chave_ = f"job_{ferramenta}"
+    atual = st.session_state.get(chave_)
+    if atual is None or atual["assinatura"] != assinatura_:
+        if atual is not None:
+            fila.cancelar(atual["id"])
+        atual = st.session_state[chave_] = {"id": submeter(), "assinatura": assinatura_, "avisado": False}
+
+    status = fila.status(atual["id"])
+    if status is not None and status["estado"] not in FINAIS:
+        if st.button("⏹️ Cancelar", key=f"{chave_}_cancelar"):
+            fila.cancelar(atual["id"])
+        prog = st.progress(0.0)
+        info = st.empty()
+        while status is not None and status["estado"] not in FINAIS:
+            if status["total"]:
+                prog.progress(min(1.0, status["feitos"] / status["total"]))
+            info.info(status["mensagem"] or "⏳ Na fila, aguardando um worker livre...")
+            time.sleep(INTERVALO)
+            status = fila.status(atual["id"])
+        prog.empty()
+        info.empty()
+
+    if status is None:
+        st.session_state.pop(chave_, None)
+        st.error("Job não encontrado (expirado ou removido).")
+        st.stop()
+    if status["estado"] != CONCLUIDO:
+        if status["estado"] == CANCELADO:
+            st.warning("Job cancelado.")
+        else:
+            st.error(f"❌ {status['erro']}")
+        if st.button("🔁 Rodar novamente", key=f"{chave_}_repetir"):
+            st.session_state.pop(chave_, None)
+            st.rerun()
+        st.stop()
+
+    # Resultado em exibição conta como uso: a limpeza por TTL não o apaga
+    manter_vivo(status["pasta"])
+    zip_ = (status["resultado"] or {}).get("zip")
+    if zip_ and not os.path.exists(zip_):
+        st.warning("⌛ Resultado expirado: os arquivos deste job já foram removidos pela limpeza da sessão.")
+        if st.button("🔁 Rodar novamente", key=f"{chave_}_expirado"):
+            st.session_state.pop(chave_, None)
+            st.rerun()
+        st.stop()
+
+    # O ping só toca na primeira exibição do resultado
+    status["novo"] = not atual["avisado"]
+    atual["avisado"] = True
+    return status
+
+
+def botao_download(rotulo: str, caminho: str, nome: str, mime: str = "application/zip"):
+    """Botão de download de um arquivo do job, lido do disco só quando o usuário pede.
+
+    O Streamlit copia ``data`` inteiro para a memória a cada reexecução; com o passo
+    "preparar", ZIPs grandes só ocupam RAM depois do pedido de download.
+    """
+    chave_ = f"download_{caminho}"
+    if not os.path.exists(caminho):
+        st.warning("⌛ Resultado expirado: o arquivo já foi removido pela limpeza da sessão.")
+        return
+    if not st.session_state.get(chave_):
+        if st.button(rotulo, key=f"{chave_}_preparar", use_container_width=True):
+            st.session_state[chave_] = True
+            st.rerun()
+        return
+    with open(caminho, "rb") as f:
+        st.download_button(f"⬇️ {nome}", f, file_name=nome, mime=mime, use_container_width=True)
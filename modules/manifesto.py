@@ -0,0 +1,134 @@
+"""Manifesto persistente das imagens exportadas pelo extrator.
+
+Uma linha por imagem (loja, produto, imagem) com o ``updated_at`` visto na
+Shopify, ETag, Last-Modified e hash do conteúdo do arquivo guardado no catálogo
+local (``V2_CATALOGO_DIR``). Cada download concluído é registrado na hora, então
+uma exportação interrompida retoma de onde parou e as seguintes só buscam o que
+mudou: imagem com o mesmo ``updated_at`` nem é pedida; o resto vai com
+``If-None-Match``/``If-Modified-Since``. O catálogo tem teto de tamanho
+(``V2_CATALOGO_MB``): as imagens usadas há mais tempo saem primeiro.
+"""
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# ============== Configuração ==============
+DB = Path(os.environ.get("V2_MANIFESTO_DB", ".cache_v2labs/manifesto.sqlite3"))
+CATALOGO_DIR = Path(os.environ.get("V2_CATALOGO_DIR", ".cache_v2labs/catalogo"))
+MAX_CATALOGO = int(os.environ.get("V2_CATALOGO_MB", "4096")) * 1024 * 1024
+# Imagens usadas há menos que isso nunca são evictadas (exportações em andamento)
+PROTECAO = 3600
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS imagens (
+    loja TEXT NOT NULL,
+    produto_id TEXT NOT NULL,
+    imagem_id TEXT NOT NULL,
+    src TEXT NOT NULL,
+    updated_at TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    hash TEXT,
+    caminho TEXT NOT NULL,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    verificado_em REAL NOT NULL,
+    PRIMARY KEY (loja, produto_id, imagem_id)
+);
+"""
+
+
+def caminho_catalogo(loja, produto_id, imagem_id, ext=".jpg") -> str:
+    return str(CATALOGO_DIR / loja / str(produto_id) / f"{imagem_id}{ext}")
+
+
+class Manifesto:
+    """Acesso à tabela de imagens (uma conexão por processo, serializada por lock)."""
+
+    def __init__(self, caminho: Path = DB):
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(caminho), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_ESQUEMA)
+
+    def get(self, loja, produto_id, imagem_id):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT * FROM imagens WHERE loja = ? AND produto_id = ? AND imagem_id = ?",
+                (loja, str(produto_id), str(imagem_id)),
+            ).fetchone()
+
+    def registrar(self, loja, produto_id, imagem_id, src, updated_at, caminho, etag="", last_modified="",
+                  hash_=None, bytes_=None):
+        """Grava a imagem como em dia. ``hash_``/``bytes_`` None (resposta 304) mantêm os anteriores."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO imagens (loja, produto_id, imagem_id, src, updated_at, etag, last_modified, hash, "
+                "caminho, bytes, verificado_em) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (loja, produto_id, imagem_id) DO UPDATE SET src = excluded.src, "
+                "updated_at = excluded.updated_at, etag = COALESCE(NULLIF(excluded.etag, ''), etag), "
+                "last_modified = COALESCE(NULLIF(excluded.last_modified, ''), last_modified), "
+                "hash = COALESCE(excluded.hash, hash), caminho = excluded.caminho, "
+                "bytes = CASE WHEN ? IS NULL THEN bytes ELSE excluded.bytes END, verificado_em = excluded.verificado_em",
+                (loja, str(produto_id), str(imagem_id), src, updated_at, etag, last_modified, hash_, caminho,
+                 bytes_ or 0, time.time(), bytes_),
+            )
+
+    def tocar(self, loja, produto_id, imagem_id):
+        """Marca a imagem como usada agora (ordem da evicção LRU)."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE imagens SET verificado_em = ? WHERE loja = ? AND produto_id = ? AND imagem_id = ?",
+                (time.time(), loja, str(produto_id), str(imagem_id)),
+            )
+
+    def liberar(self, limite: int = MAX_CATALOGO, antes_de=None):
+        """Evicta (arquivo e linha) as imagens menos usadas até o catálogo caber em ``limite``.
+
+        Só entram imagens usadas antes de ``antes_de`` e fora da janela de ``PROTECAO``,
+        para não apagar o que uma exportação em andamento ainda vai colocar no ZIP.
+        """
+        corte = time.time() - PROTECAO
+        if antes_de is not None:
+            corte = min(corte, antes_de)
+        with self._lock:
+            total = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM imagens").fetchone()[0]
+            if total <= limite:
+                return 0
+            candidatas = self._conn.execute(
+                "SELECT loja, produto_id, imagem_id, caminho, bytes FROM imagens "
+                "WHERE verificado_em < ? ORDER BY verificado_em", (corte,),
+            ).fetchall()
+        removidas = 0
+        for row in candidatas:
+            if total <= limite:
+                break
+            try:
+                os.remove(row["caminho"])
+            except OSError:
+                pass
+            with self._lock:
+                self._conn.execute(
+                    "DELETE FROM imagens WHERE loja = ? AND produto_id = ? AND imagem_id = ?",
+                    (row["loja"], row["produto_id"], row["imagem_id"]),
+                )
+            total -= row["bytes"]
+            removidas += 1
+        return removidas
+
+
+_manifesto = None
+_manifesto_lock = threading.Lock()
+
+
+def get_manifesto() -> Manifesto:
+    global _manifesto
+    with _manifesto_lock:
+        if _manifesto is None:
+            _manifesto = Manifesto()
+        return _manifesto
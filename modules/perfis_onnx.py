@@ -0,0 +1,143 @@
+import importlib.util
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+
+ARQUIVO_PERFIS = os.environ.get("V2_PERFIS_ONNX", "perfis_onnx.json")
+
+OTIMIZACOES = ("desativada", "básica", "estendida", "todas")
+VARIANTES = ("fp32", "int8", "fp16")
+
+
+@dataclass(frozen=True)
+class PerfilOnnx:
+    """Ajustes do onnxruntime usados para criar uma sessão do removedor."""
+
+    nome: str = "padrão"
+    intra_op: int = 0  # 0 = decide o onnxruntime (ou OMP_NUM_THREADS, nos workers de processo)
+    inter_op: int = 0
+    otimizacao: str = "todas"
+    paralelo: bool = False
+    arena_cpu: bool = True
+    mem_pattern: bool = True
+    variante: str = "fp32"
+
+    def chave(self):
+        """Identifica a sessão no pool; o nome do perfil não altera a sessão."""
+        return tuple(v for k, v in asdict(self).items() if k != "nome")
+
+    def sess_options(self):
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        intra = self.intra_op or int(os.environ.get("OMP_NUM_THREADS", "0"))
+        if intra:
+            opts.intra_op_num_threads = intra
+        if self.inter_op:
+            opts.inter_op_num_threads = self.inter_op
+        opts.graph_optimization_level = {
+            "desativada": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+            "básica": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+            "estendida": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        }.get(self.otimizacao, ort.GraphOptimizationLevel.ORT_ENABLE_ALL)
+        opts.execution_mode = ort.ExecutionMode.ORT_PARALLEL if self.paralelo else ort.ExecutionMode.ORT_SEQUENTIAL
+        opts.enable_cpu_mem_arena = self.arena_cpu
+        opts.enable_mem_pattern = self.mem_pattern
+        return opts
+
+
+PADRAO = PerfilOnnx()
+
+
+# ============== Persistência ==============
+def carregar_perfis():
+    perfis = {PADRAO.nome: PADRAO}
+    try:
+        dados = json.loads(Path(ARQUIVO_PERFIS).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return perfis
+    validos = {f.name for f in fields(PerfilOnnx)}
+    for nome, campos in dados.items():
+        campos = {k: v for k, v in campos.items() if k in validos}
+        perfis[nome] = PerfilOnnx(**{**campos, "nome": nome})
+    return perfis
+
+
+def salvar_perfil(perfil: PerfilOnnx):
+    perfis = carregar_perfis()
+    perfis[perfil.nome] = perfil
+    dados = {n: asdict(p) for n, p in perfis.items() if n != PADRAO.nome}
+    Path(ARQUIVO_PERFIS).write_text(json.dumps(dados, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+# ============== Variantes quantizadas ==============
+def _classe_sessao(model: str):
+    from rembg.sessions import sessions_class
+
+    for cls in sessions_class:
+        if cls.name() == model:
+            return cls
+    raise ValueError(f"Modelo desconhecido: {model}")
+
+
+def caminho_modelo(model: str, variante: str = "fp32") -> Path:
+    """Caminho do .onnx da variante; gera e guarda a versão quantizada na primeira vez."""
+    base = Path(str(_classe_sessao(model).download_models()))
+    if variante == "fp32":
+        return base
+    destino = base.with_name(f"{base.stem}.{variante}.onnx")
+    if destino.exists():
+        return destino
+    tmp = destino.with_suffix(".tmp")
+    if variante == "int8":
+        # onnxruntime.quantization depende do pacote onnx, que o onnxruntime não instala
+        if importlib.util.find_spec("onnx") is None:
+            raise RuntimeError("Variante int8 requer: pip install onnx")
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(base), str(tmp), weight_type=QuantType.QUInt8)
+    elif variante == "fp16":
+        try:
+            import onnx
+            from onnxconverter_common import float16
+        except ImportError:
+            raise RuntimeError("Variante fp16 requer: pip install onnx onnxconverter-common")
+        onnx.save(float16.convert_float_to_float16(onnx.load(str(base)), keep_io_types=True), str(tmp))
+    else:
+        raise ValueError(f"Variante desconhecida: {variante}")
+    os.replace(tmp, destino)
+    return destino
+
+
+def criar_sessao(model: str, perfil: PerfilOnnx = PADRAO):
+    """Sessão rembg do modelo com as opções (e a variante) do perfil."""
+    cls = _classe_sessao(model)
+    if perfil.variante != "fp32":
+        caminho = str(caminho_modelo(model, perfil.variante))
+        cls = type(f"{cls.__name__}_{perfil.variante}", (cls,), {
+            "download_models": classmethod(lambda c, *a, **k: caminho),
+        })
+    return cls(model, perfil.sess_options())
+
+
+# ============== Benchmark ==============
+def benchmark(model: str, perfil: PerfilOnnx, amostras):
+    """Mede carga do modelo e recorte de ``amostras`` (bytes) com uma sessão nova do perfil."""
+    from rembg import remove
+
+    t0 = time.perf_counter()
+    session = criar_sessao(model, perfil)
+    carga = time.perf_counter() - t0
+    remove(amostras[0], session=session)  # aquecimento
+    t0 = time.perf_counter()
+    for raw in amostras:
+        remove(raw, session=session)
+    total = time.perf_counter() - t0
+    return {
+        "perfil": perfil.nome,
+        "variante": perfil.variante,
+        "carga (s)": round(carga, 2),
+        "ms/imagem": round(1000 * total / len(amostras), 1),
+        "imagens/s": round(len(amostras) / total, 2) if total else 0.0,
+    }
@@ -0,0 +1,126 @@
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+
+def planejar_workers(n_cpus=None, threads_por_worker=None):
+    """Escolhe (workers, threads por worker) de modo que workers × threads ≈ núcleos."""
+    cpus = n_cpus or os.cpu_count() or 1
+    if threads_por_worker is None:
+        threads_por_worker = 4 if cpus >= 16 else 2 if cpus >= 4 else 1
+    threads_por_worker = max(1, min(threads_por_worker, cpus))
+    return max(1, cpus // threads_por_worker), threads_por_worker
+
+
+def executar_em_janela(ex, fn, itens, janela):
+    """Submete ``fn(item)`` com no máximo ``janela`` tarefas em voo e gera os Futures concluídos.
+
+    Diferente de submeter tudo e usar ``as_completed``, nenhum resultado fica
+    retido depois de consumido: a memória não cresce com o tamanho do lote.
+    """
+    itens = iter(itens)
+    pendentes = set()
+    for item in itens:
+        pendentes.add(ex.submit(fn, item))
+        if len(pendentes) >= janela:
+            break
+    while pendentes:
+        prontos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+        for f in prontos:
+            for item in itens:
+                pendentes.add(ex.submit(fn, item))
+                break
+            yield f
+
+
+# ============== Transporte por memória compartilhada ==============
+def _para_shm(data: bytes):
+    shm = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+    shm.buf[:len(data)] = data
+    nome = shm.name
+    shm.close()
+    return nome, len(data)
+
+
+def _de_shm(nome: str, tamanho: int, unlink: bool) -> bytes:
+    shm = shared_memory.SharedMemory(name=nome)
+    try:
+        return bytes(shm.buf[:tamanho])
+    finally:
+        shm.close()
+        if unlink:
+            shm.unlink()
+
+
+def _inicializar(threads, initializer, initargs):
+    # Limita os threads internos do onnxruntime/BLAS antes de qualquer sessão ser criada
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def _executar(fn, nome, tamanho, args):
+    raw = _de_shm(nome, tamanho, unlink=False)
+    return _para_shm(fn(raw, *args))
+
+
+class SharedMemoryPool:
+    """ProcessPoolExecutor em que entradas e saídas (bytes) trafegam por memória compartilhada.
+
+    ``fn`` precisa ser uma função de nível de módulo ``fn(raw, *args) -> bytes``.
+    """
+
+    def __init__(self, workers=None, threads=None, initializer=None, initargs=()):
+        auto_w, auto_t = planejar_workers(threads_por_worker=threads)
+        self.workers = workers or auto_w
+        self.threads = auto_t
+        self._ex = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_inicializar,
+            initargs=(self.threads, initializer, initargs),
+        )
+
+    def submit(self, fn, raw: bytes, *args) -> Future:
+        nome, tamanho = _para_shm(raw)
+        saida = Future()
+
+        def _concluir(f):
+            try:
+                res = f.result()
+            except Exception as e:
+                saida.set_exception(e)
+            else:
+                try:
+                    saida.set_result(_de_shm(*res, unlink=True))
+                except Exception as e:
+                    saida.set_exception(e)
+            finally:
+                try:
+                    _de_shm(nome, 0, unlink=True)
+                except FileNotFoundError:
+                    pass
+
+        self._ex.submit(_executar, fn, nome, tamanho, args).add_done_callback(_concluir)
+        return saida
+
+    def shutdown(self, wait=True):
+        self._ex.shutdown(wait=wait)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_process_pool(nome: str, **kwargs) -> SharedMemoryPool:
+    """Pool nomeado e persistente, para manter os workers (e seus modelos) entre reexecuções."""
+    with _pools_lock:
+        pool = _pools.get(nome)
+        if pool is not None and getattr(pool._ex, "_broken", False):
+            pool = None  # algum worker morreu (ex.: falta de memória): recria o pool
+        if pool is None:
+            pool = _pools[nome] = SharedMemoryPool(**kwargs)
+        return pool
@@ -0,0 +1,71 @@
+import io
+import threading
+import zipfile
+from collections import OrderedDict
+
+import streamlit as st
+from PIL import Image
+
+LADO = 360
+MAX_MINIATURAS = 512
+
+
+class ThumbCache:
+    """Miniaturas decodificadas (LRU por quantidade), compartilhadas entre reexecuções."""
+
+    def __init__(self, maximo=MAX_MINIATURAS):
+        self.maximo = maximo
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave, ler, lado=LADO) -> Image.Image:
+        with self._lock:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                return self._itens[chave]
+        img = Image.open(io.BytesIO(ler()))
+        if img.format == "JPEG":
+            img.draft("RGB", (lado, lado))
+        img = img.convert("RGBA")
+        img.thumbnail((lado, lado))
+        with self._lock:
+            self._itens[chave] = img
+            while len(self._itens) > self.maximo:
+                self._itens.popitem(last=False)
+        return img
+
+
+_thumbs = ThumbCache()
+
+
+def miniatura(chave, ler) -> Image.Image:
+    return _thumbs.get(chave, ler)
+
+
+def ler_do_zip(zip_path: str, arcname: str):
+    """Leitor preguiçoso de um item do ZIP de saída."""
+    def _ler():
+        with zipfile.ZipFile(zip_path) as z:
+            return z.read(arcname)
+    return _ler
+
+
+def misturar(antes: Image.Image, depois: Image.Image, t: float) -> Image.Image:
+    """Mistura vetorizada (numpy) de duas miniaturas RGBA."""
+    import numpy as np
+
+    if antes.size != depois.size:
+        antes = antes.resize(depois.size)
+    a = np.asarray(antes, dtype=np.float32)
+    b = np.asarray(depois, dtype=np.float32)
+    return Image.fromarray((a + (b - a) * t).astype(np.uint8), mode="RGBA")
+
+
+def paginar(total: int, por_pagina: int, key: str):
+    """Controle de página; devolve o intervalo (início, fim) da página atual."""
+    paginas = max(1, -(-total // por_pagina))
+    pagina = 1
+    if paginas > 1:
+        pagina = st.number_input(f"Página (1–{paginas})", 1, paginas, 1, 1, key=key)
+    inicio = (pagina - 1) * por_pagina
+    return inicio, min(total, inicio + por_pagina)
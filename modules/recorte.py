@@ -0,0 +1,210 @@
+import io
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+from PIL import Image, ImageFilter, ImageOps
+
+# ============== Parâmetros de pré-processamento por modelo (iguais aos do rembg) ==============
+_PARAMS = {
+    "u2net": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    "u2net_human_seg": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    "isnet-general-use": ((0.485, 0.456, 0.406), (1.0, 1.0, 1.0), (1024, 1024)),
+}
+
+TAMANHO_LOTE = int(os.environ.get("V2_LOTE_TAMANHO", "8"))
+LATENCIA_MAX = float(os.environ.get("V2_LOTE_LATENCIA_MS", "50")) / 1000
+
+
+def _preprocessar(img: Image.Image, model: str) -> np.ndarray:
+    """Converte a imagem no tensor (3, H, W) de entrada do modelo."""
+    mean, std, size = _PARAMS[model]
+    arr = np.asarray(img.convert("RGB").resize(size, Image.Resampling.LANCZOS), dtype=np.float32)
+    arr = arr / max(float(arr.max()), 1e-6)
+    arr = (arr - np.array(mean, dtype=np.float32)) / np.array(std, dtype=np.float32)
+    return arr.transpose((2, 0, 1))
+
+
+def _mascara(pred: np.ndarray, tamanho) -> Image.Image:
+    """Normaliza a predição de uma imagem e redimensiona para o tamanho original."""
+    mi, ma = float(pred.min()), float(pred.max())
+    pred = (pred - mi) / max(ma - mi, 1e-6)
+    mask = Image.fromarray((pred * 255).astype("uint8"), mode="L")
+    return mask.resize(tamanho, Image.Resampling.LANCZOS)
+
+
+def _png(img: Image.Image) -> bytes:
+    bio = io.BytesIO()
+    img.save(bio, format="PNG")
+    return bio.getvalue()
+
+
+def _recortar(img: Image.Image, mask: Image.Image, finalizar=None) -> bytes:
+    """Aplica a máscara; ``finalizar(rgba) -> bytes`` substitui a codificação PNG padrão."""
+    img = img.convert("RGBA")
+    cutout = Image.composite(img, Image.new("RGBA", img.size, (0, 0, 0, 0)), mask)
+    return (finalizar or _png)(cutout)
+
+
+def finalizador_canvas(canvas):
+    """Etapa final do pipeline removedor → canvas, ``canvas = (target, bg_color, fmt)``."""
+    if canvas is None:
+        return None
+    from modules.conversao import centralizar_e_codificar
+    target, bg_color, fmt = canvas
+    return lambda img: centralizar_e_codificar(img, target, bg_color, fmt)
+
+
+def remover_rembg(raw: bytes, session, finalizar=None) -> bytes:
+    """``rembg.remove`` que entrega o RGBA ao ``finalizar`` sem passar por um PNG intermediário."""
+    from rembg import remove
+    if finalizar is None:
+        return remove(raw, session=session)
+    return finalizar(remove(Image.open(io.BytesIO(raw)), session=session))
+
+
+# ============== Inferência em resolução reduzida ==============
+def lado_inferencia(model: str) -> int:
+    """Maior lado da cópia reduzida: folga sobre a entrada do modelo (320 ou 1024 px)."""
+    return max(1024, _PARAMS[model][2][0])
+
+
+def abrir_reduzida(raw: bytes, lado: int) -> Image.Image:
+    """Decodifica uma cópia pequena (draft de JPEG + thumbnail) só para a inferência."""
+    img = Image.open(io.BytesIO(raw))
+    if img.format == "JPEG":
+        img.draft("RGB", (lado, lado))
+    img = ImageOps.exif_transpose(img)
+    img.thumbnail((lado, lado), Image.Resampling.BILINEAR)
+    return img
+
+
+def _refinar_borda(mask: Image.Image, escala: float) -> Image.Image:
+    """Suaviza o serrilhado do upsample e devolve contraste à transição da borda."""
+    raio = max(1.0, escala / 2)
+    mask = mask.filter(ImageFilter.GaussianBlur(raio))
+    return mask.point(lambda v: 0 if v < 16 else 255 if v > 239 else (v - 16) * 255 // 223)
+
+
+def aplicar_mascara(raw: bytes, mask: Image.Image, refinar: bool = True, finalizar=None) -> bytes:
+    """Amplia a máscara prevista para a resolução original e recorta a imagem completa."""
+    full = ImageOps.exif_transpose(Image.open(io.BytesIO(raw)))
+    escala = full.width / mask.width
+    if mask.size != full.size:
+        mask = mask.resize(full.size, Image.Resampling.BILINEAR)
+        if refinar and escala > 1:
+            mask = _refinar_borda(mask, escala)
+    return _recortar(full, mask, finalizar)
+
+
+def remover_reduzido(raw: bytes, session, model: str, refinar: bool = True, finalizar=None) -> bytes:
+    reduzida = abrir_reduzida(raw, lado_inferencia(model))
+    return aplicar_mascara(raw, inferir(session, model, [reduzida])[0], refinar, finalizar)
+
+
+def remover_bytes(raw: bytes, model: str, reduzir: bool = False, refinar: bool = True, perfil=None, canvas=None) -> bytes:
+    """Recorte de uma imagem com a sessão do processo atual (usado nos workers de processo)."""
+    from modules.sessoes_onnx import usar_sessao
+    finalizar = finalizador_canvas(canvas)
+    with usar_sessao(model, perfil) as session:
+        if reduzir:
+            return remover_reduzido(raw, session, model, refinar, finalizar)
+        return remover_rembg(raw, session, finalizar)
+
+
+def predizer(session, tensores) -> np.ndarray:
+    """Um único session.run para N tensores já pré-processados; devolve as predições (N, H, W)."""
+    ort = session.inner_session
+    nome = ort.get_inputs()[0].name
+    tensor = np.stack(tensores)
+    try:
+        return ort.run(None, {nome: tensor})[0][:, 0, :, :]
+    except Exception:
+        # Modelos exportados com batch fixo = 1: cai para uma execução por imagem
+        return np.concatenate([ort.run(None, {nome: t[None]})[0][:, 0, :, :] for t in tensor])
+
+
+def inferir(session, model: str, imgs):
+    """Roda um único session.run para N imagens e devolve uma máscara por imagem."""
+    preds = predizer(session, [_preprocessar(i, model) for i in imgs])
+    return [_mascara(p, i.size) for p, i in zip(preds, imgs)]
+
+
+class BatchInferer:
+    """Agrupa pedidos de várias threads em lotes de inferência ONNX.
+
+    Um lote sai quando atinge ``tamanho`` imagens ou quando o primeiro pedido
+    espera mais que ``latencia`` segundos (lotes parciais). Pré-processamento e
+    ampliação da máscara (LANCZOS, caros em fotos grandes) rodam na thread de quem
+    pediu; a thread do lote só empilha os tensores e roda o modelo.
+    """
+
+    def __init__(self, session, model: str, tamanho=TAMANHO_LOTE, latencia=LATENCIA_MAX):
+        if model not in _PARAMS:
+            raise ValueError(f"Modelo sem suporte a lote: {model}")
+        self.session = session
+        self.model = model
+        self.tamanho = max(1, tamanho)
+        self.latencia = latencia
+        self._fila = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def submit(self, img: Image.Image) -> Future:
+        """Pré-processa a imagem aqui e a enfileira; o Future resolve para a predição crua."""
+        fut = Future()
+        self._fila.put((_preprocessar(img, self.model), fut))
+        return fut
+
+    def mascara(self, img: Image.Image) -> Image.Image:
+        """Máscara da imagem no tamanho dela (a ampliação roda na thread de quem chama)."""
+        return _mascara(self.submit(img).result(), img.size)
+
+    def remove(self, raw: bytes, reduzir: bool = False, refinar: bool = True, finalizar=None) -> bytes:
+        """Equivalente a ``rembg.remove(raw)``, com a inferência feita em lote."""
+        if reduzir:
+            reduzida = abrir_reduzida(raw, lado_inferencia(self.model))
+            return aplicar_mascara(raw, self.mascara(reduzida), refinar, finalizar)
+        img = ImageOps.exif_transpose(Image.open(io.BytesIO(raw)))
+        return _recortar(img, self.mascara(img), finalizar)
+
+    def close(self):
+        self._fila.put(None)
+        self._thread.join()
+
+    def _loop(self):
+        while True:
+            item = self._fila.get()
+            if item is None:
+                return
+            lote = [item]
+            limite = time.monotonic() + self.latencia
+            fechar = False
+            while len(lote) < self.tamanho:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    item = self._fila.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if item is None:
+                    fechar = True
+                    break
+                lote.append(item)
+            self._processar(lote)
+            if fechar:
+                return
+
+    def _processar(self, lote):
+        try:
+            preds = predizer(self.session, [tensor for tensor, _ in lote])
+        except Exception as e:
+            for _, fut in lote:
+                fut.set_exception(e)
+            return
+        for (_, fut), pred in zip(lote, preds):
+            fut.set_result(pred)
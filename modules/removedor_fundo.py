@@ -1,30 +1,24 @@
+import importlib.util
 import streamlit as st
-from PIL import Image
-import io, os, shutil, zipfile, base64
-from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
-
-try:
-    from rembg import remove, new_session
-    _HAS_REMBG = True
-except Exception:
-    _HAS_REMBG = False
-
-
-def _play_ping(ping_b64: str):
-    st.markdown(f'<audio autoplay src="data:audio/wav;base64,{ping_b64}"></audio>', unsafe_allow_html=True)
-
-
-def render(ping_b64: str):
-    # ====== CARREGAR IMAGEM COMO BASE64 ======
-    banner_path = "assets/removedor_banner.png"
-    try:
-        with open(banner_path, "rb") as f:
-            b64_banner = base64.b64encode(f.read()).decode("utf-8")
-    except FileNotFoundError:
-        st.error("❌ Imagem de banner não encontrada em 'assets/removedor_banner.png'")
-        st.stop()
+from dataclasses import asdict
+
+from modules.assets import tocar_ping, url
+from modules.sessoes_onnx import MODELOS
+from modules.pool_processos import planejar_workers
+from modules.conversao import FORMATOS
+from modules.entrada import listar_entradas, salvar_uploads
+from modules.fila_jobs import get_fila
+from modules.jobs_ui import acompanhar, assinatura, botao_download
+from modules.previews import ler_do_zip, miniatura, misturar, paginar
+from modules.workspace import workspace_da_sessao
+from modules.perfis_onnx import OTIMIZACOES, PADRAO, VARIANTES, PerfilOnnx, benchmark, carregar_perfis, salvar_perfil
+from modules.recorte import TAMANHO_LOTE
+
+# Só verifica se o rembg existe: o import de verdade (onnxruntime etc.) fica para quando uma sessão é criada
+_HAS_REMBG = all(importlib.util.find_spec(m) is not None for m in ("rembg", "onnxruntime"))
+
 
+def render():
     # ====== CSS GLOBAL ======
     st.markdown("""
     <style>
@@ -106,7 +100,7 @@ def render(ping_b64: str):
     <div class="hero-container">
         <div class="hero-title">REMOVEDOR DE FUNDO</div>
         <div class="hero">
-            <img src="data:image/png;base64,{b64_banner}" class="bg" alt="background">
+            <img src="{url('removedor_banner.png')}" class="bg" alt="background">
         </div>
     </div>
     """, unsafe_allow_html=True)
@@ -120,11 +114,69 @@ def render(ping_b64: str):
     with st.expander("⚙️ Configurações avançadas", expanded=False):
         model = st.selectbox(
             "Modelo",
-            ("u2net_human_seg", "u2net", "isnet-general-use"),
+            MODELOS,
             index=0,
             help="Escolha o modelo de recorte — o padrão é otimizado para pessoas."
         )
         st.caption("💡 Dica: 'u2net_human_seg' é ideal para retratos humanos.")
+        perfis = carregar_perfis()
+        perfil = perfis[st.selectbox("Perfil ONNX", list(perfis), index=0, help="Threads, otimização de grafo, arena de memória e variante quantizada do modelo.")]
+        # O perfil padrão usa o new_session do rembg, igual ao warmup do app
+        perfil_sessao = None if perfil == PADRAO else perfil
+        with st.form("novo_perfil_onnx"):
+            st.caption("Novo perfil do onnxruntime")
+            c1, c2 = st.columns(2)
+            with c1:
+                p_nome = st.text_input("Nome do perfil")
+                p_intra = st.number_input("Threads intra-op (0 = auto)", 0, 256, 0)
+                p_inter = st.number_input("Threads inter-op (0 = auto)", 0, 256, 0)
+                p_otim = st.selectbox("Otimização do grafo", OTIMIZACOES, index=len(OTIMIZACOES) - 1)
+            with c2:
+                p_variante = st.selectbox("Variante do modelo", VARIANTES, index=0)
+                p_paralelo = st.toggle("Execução paralela (inter-op)", value=False)
+                p_arena = st.toggle("Arena de memória da CPU", value=True)
+                p_pattern = st.toggle("Memory pattern", value=True)
+            if st.form_submit_button("💾 Salvar perfil") and p_nome.strip() and p_nome.strip() != PADRAO.nome:
+                salvar_perfil(PerfilOnnx(
+                    nome=p_nome.strip(), intra_op=int(p_intra), inter_op=int(p_inter), otimizacao=p_otim,
+                    paralelo=p_paralelo, arena_cpu=p_arena, mem_pattern=p_pattern, variante=p_variante,
+                ))
+                st.rerun()
+
+        deduplicar = st.toggle("Detectar imagens duplicadas", value=True, help="Cada conteúdo é processado uma vez e o resultado vai para todos os caminhos.")
+        semelhantes = deduplicar and st.toggle("Incluir quase idênticas (hash perceptual)", value=False, help="Trata cópias reencodadas ou redimensionadas como a mesma imagem. Atenção: fotos quase iguais (ex.: variantes de cor do mesmo produto) podem receber o resultado de outra; a cor e a proporção são conferidas, mas revise a saída.")
+
+        n_w, n_t = planejar_workers()
+        execucao = st.radio(
+            "Execução",
+            ("Threads", "Processos"),
+            horizontal=True,
+            help=f"Processos: {n_w} workers × {n_t} threads, cada um com sua própria sessão ONNX."
+        )
+        em_lote = execucao == "Threads" and st.toggle("Inferência em lote", value=True, help="Agrupa várias imagens em uma única chamada ao modelo (mais rápido em CPU).")
+        reduzir = st.toggle(
+            "Inferência em baixa resolução",
+            value=False,
+            help="O modelo roda sobre uma cópia reduzida e só a máscara é ampliada para a imagem original (menos memória por worker)."
+        )
+        refinar = st.toggle("Refinar bordas da máscara", value=True, disabled=not reduzir)
+        tamanho_lote = st.slider("Imagens por lote", 1, 32, TAMANHO_LOTE, 1, disabled=not em_lote) if execucao == "Threads" else 1
+
+    # ====== PIPELINE REMOVER → CANVAS ======
+    canvas = None
+    if st.toggle("🧩 Centralizar em canvas após remover o fundo", value=False, help="Entrega direto em 1080x1080/1080x1920, sem passar pelo conversor."):
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            canvas_label = st.radio("Resolução", ("1080x1080", "1080x1920"), horizontal=True)
+            canvas_target = (1080, 1080) if canvas_label == "1080x1080" else (1080, 1920)
+        with c2:
+            canvas_bg = None
+            if st.toggle("Usar cor de fundo", value=False):
+                hexcor = st.color_picker("Cor de fundo", "#f2f2f2")
+                canvas_bg = tuple(int(hexcor.strip("#")[i:i+2], 16) for i in (0, 2, 4))
+        with c3:
+            canvas_fmt = st.selectbox("Formato de saída", FORMATOS, index=0)
+        canvas = (canvas_target, canvas_bg, canvas_fmt)
 
     # ====== UPLOAD ======
     files = st.file_uploader(
@@ -136,108 +188,82 @@ def render(ping_b64: str):
         st.markdown('<div class="custom-alert">👆 Envie suas imagens acima para começar.</div>', unsafe_allow_html=True)
         st.stop()
 
-    INP, OUT = "rm_in", "rm_out"
-    shutil.rmtree(INP, ignore_errors=True)
-    shutil.rmtree(OUT, ignore_errors=True)
-    os.makedirs(INP, exist_ok=True)
-    os.makedirs(OUT, exist_ok=True)
-
-    # ====== EXTRAÇÃO COMPLETA (ZIP COM SUBPASTAS) ======
-    from zipfile import ZipFile, BadZipFile
-
-    def extract_all(zip_file, extract_to):
-        """Extrai ZIP incluindo subpastas preservando estrutura"""
-        for member in zip_file.infolist():
-            try:
-                zip_file.extract(member, extract_to)
-            except Exception as e:
-                st.warning(f"Não foi possível extrair {member.filename}: {e}")
-
-    for f in files:
-        if f.name.lower().endswith(".zip"):
-            try:
-                with ZipFile(io.BytesIO(f.read())) as z:
-                    extract_all(z, INP)
-            except BadZipFile:
-                st.error(f"❌ ZIP inválido: {f.name}")
-        else:
-            file_path = os.path.join(INP, f.name)
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            with open(file_path, "wb") as out:
-                out.write(f.read())
-
-    paths = [p for p in Path(INP).rglob("*") if p.suffix.lower() in (".jpg", ".jpeg", ".png", ".webp")]
-    if not paths:
+    # ====== LEITURA DAS ENTRADAS (ZIP LIDO SOB DEMANDA, SEM EXTRAIR) ======
+    erros = []
+    entradas = listar_entradas(files, erros)
+    for e in erros:
+        st.error(f"❌ {e}")
+    if not entradas:
         st.warning("Nenhuma imagem válida foi encontrada dentro das pastas enviadas.")
         st.stop()
 
-    session = new_session(model)
-
-    prog = st.progress(0.0)
-    info = st.empty()
-    previews = []
-
-    def worker(p: Path):
-        rel = p.relative_to(INP)
-        raw = open(p, "rb").read()
-        out_bytes = remove(raw, session=session)
-        outp = (Path(OUT) / rel).with_suffix(".png")
-        os.makedirs(outp.parent, exist_ok=True)
-        open(outp, "wb").write(out_bytes)
-        return raw, out_bytes, rel.as_posix()
-
-    with ThreadPoolExecutor(max_workers=4) as ex:
-        fut = [ex.submit(worker, p) for p in paths]
-        tot = len(fut)
-        for i, f in enumerate(as_completed(fut), 1):
-            try:
-                previews.append(f.result())
-            except Exception as e:
-                st.error(f"Erro ao processar: {e}")
-            prog.progress(i / tot)
-            info.info(f"Processado {i}/{tot}")
+    # ====== BENCHMARK DE PERFIS ======
+    with st.expander("📊 Benchmark de perfis ONNX", expanded=False):
+        escolhidos = st.multiselect("Perfis", list(perfis), default=[perfil.nome])
+        n_amostras = st.slider("Imagens de amostra", 1, min(20, len(entradas)), min(5, len(entradas))) if len(entradas) > 1 else 1
+        if st.button("Rodar benchmark"):
+            amostras = [e.ler() for e in entradas[:n_amostras]]
+            linhas = []
+            for nome in escolhidos:
+                with st.spinner(f"Medindo perfil '{nome}'..."):
+                    try:
+                        linhas.append(benchmark(model, perfis[nome], amostras))
+                    except Exception as e:
+                        st.error(f"Perfil '{nome}' falhou: {e}")
+            if linhas:
+                st.dataframe(linhas, use_container_width=True)
+
+    # ====== PROCESSAMENTO (FILA DE JOBS) ======
+    params = {
+        "model": model,
+        "perfil": asdict(perfil_sessao) if perfil_sessao is not None else None,
+        "reduzir": reduzir,
+        "refinar": refinar,
+        "execucao": execucao,
+        "em_lote": em_lote,
+        "tamanho_lote": tamanho_lote,
+        "canvas": canvas,
+        "deduplicar": deduplicar,
+        "semelhantes": semelhantes,
+    }
+
+    def submeter():
+        # Uploads vão para a pasta do job: o worker não depende desta sessão do navegador
+        ws = workspace_da_sessao(st.session_state)
+        pasta = ws.novo_job("removedor")
+        arquivos = salvar_uploads(files, pasta / "entrada")
+        return get_fila().submeter("removedor", pasta, {**params, "arquivos": arquivos, "limite": ws.restante()}, sessao=ws.id)
+
+    job = acompanhar("removedor", assinatura(files, params), submeter)
+    resultado = job["resultado"]
+    zip_path = resultado["zip"]
+    itens = resultado["itens"]
+    for erro in resultado["erros"]:
+        st.error(erro)
+    if resultado["resumo"]:
+        st.info(resultado["resumo"])
 
     st.markdown("<hr style='border: 0; border-top: 1px solid #ccc;'>", unsafe_allow_html=True)
     st.subheader("🖼️ Pré-visualização (Antes / Depois)")
     alpha = st.slider("Comparação de mistura", 0, 100, 50, 1)
     blend = alpha / 100.0
 
+    # Miniaturas em cache (chave = hash do conteúdo); a mistura roda só sobre elas
+    inicio, fim = paginar(len(itens), 3, key="rm_pagina")
     cols = st.columns(2)
-    for orig_b, out_b, name in previews[:3]:
+    for idx, name, h, k in itens[inicio:fim]:
+        antes = miniatura(("orig", h), entradas[idx].ler)
+        depois = miniatura(("rm", k), ler_do_zip(zip_path, name))
         with cols[0]:
-            st.image(orig_b, caption=f"ANTES — {name}", use_column_width=True)
+            st.image(antes, caption=f"ANTES — {name}", use_column_width=True)
         with cols[1]:
-            try:
-                img_o = Image.open(io.BytesIO(orig_b)).convert("RGBA")
-                img_r = Image.open(io.BytesIO(out_b)).convert("RGBA")
-                w = min(img_o.width, img_r.width)
-                h = min(img_o.height, img_r.height)
-                img_o = img_o.resize((w, h))
-                img_r = img_r.resize((w, h))
-                blended = Image.blend(img_o, img_r, blend)
-                bio = io.BytesIO()
-                blended.save(bio, format="PNG")
-                bio.seek(0)
-                st.image(bio, caption=f"DEPOIS — {name}", use_column_width=True)
-            except Exception:
-                st.image(out_b, caption=f"DEPOIS — {name}", use_column_width=True)
-
-    # ====== CRIAR ZIP FINAL ======
-    zbytes = io.BytesIO()
-    with zipfile.ZipFile(zbytes, "w", zipfile.ZIP_DEFLATED) as z:
-        for root, _, files in os.walk(OUT):
-            for fn in files:
-                fp = os.path.join(root, fn)
-                arc = os.path.relpath(fp, OUT)
-                z.write(fp, arc)
-    zbytes.seek(0)
+            st.image(misturar(antes, depois, blend), caption=f"DEPOIS — {name}", use_column_width=True)
 
     st.success("✅ Remoção de fundo concluída!")
-    _play_ping(ping_b64)
-    st.download_button(
-        "📦 Baixar PNGs sem fundo",
-        data=zbytes,
-        file_name="sem_fundo.zip",
-        mime="application/zip",
-        use_container_width=True
+    if job["novo"]:
+        tocar_ping()
+    botao_download(
+        "📦 Baixar PNGs sem fundo" if canvas is None else "📦 Baixar imagens sem fundo centralizadas",
+        zip_path,
+        "sem_fundo.zip",
     )
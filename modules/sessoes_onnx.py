@@ -0,0 +1,166 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+MODELOS = ("u2net_human_seg", "u2net", "isnet-general-use")
+
+# ============== Configuração ==============
+MAX_MEMORIA = int(os.environ.get("V2_ONNX_MEMORIA_MB", "1500")) * 1024 * 1024
+MAX_OCIOSO = float(os.environ.get("V2_ONNX_OCIOSO_S", "900"))
+WARMUP = [m for m in os.environ.get("V2_ONNX_WARMUP", "u2net_human_seg").split(",") if m]
+
+# Estimativa de RAM por sessão (pesos + arena do onnxruntime) quando o .onnx ainda não existe
+_TAMANHO_PADRAO = {"u2net_human_seg": 176, "u2net": 176, "isnet-general-use": 179}
+
+
+def _estimar_memoria(model: str, variante: str = "fp32") -> int:
+    home = Path(os.environ.get("U2NET_HOME", "~/.u2net")).expanduser()
+    arq = home / (f"{model}.onnx" if variante == "fp32" else f"{model}.{variante}.onnx")
+    try:
+        tamanho = arq.stat().st_size
+    except OSError:
+        tamanho = _TAMANHO_PADRAO.get(model, 180) * 1024 * 1024
+    return tamanho * 2
+
+
+def _criar_sessao(model: str, perfil=None):
+    if perfil is None:
+        from rembg import new_session
+        return new_session(model)
+    from modules.perfis_onnx import criar_sessao
+    return criar_sessao(model, perfil)
+
+
+class SessionPool:
+    """Pool de sessões ONNX por (modelo, perfil), com limite de memória e evicção de ociosas.
+
+    Sessões adquiridas (``adquirir``/``usar``) contam usuários ativos e nunca são
+    evictadas enquanto alguém as usa, então o limite de memória continua valendo.
+    """
+
+    def __init__(self, max_memoria=MAX_MEMORIA, max_ocioso=MAX_OCIOSO):
+        self.max_memoria = max_memoria
+        self.max_ocioso = max_ocioso
+        self._sessoes = {}  # (model, perfil) -> [session, ultimo_uso, memoria, usuarios]
+        self._carregando = {}
+        self._lock = threading.Lock()
+        threading.Thread(target=self._limpeza, daemon=True).start()
+
+    @staticmethod
+    def _chave(model, perfil):
+        return (model, perfil.chave() if perfil else None)
+
+    def _obter(self, model: str, perfil, usuarios: int):
+        k = self._chave(model, perfil)
+        with self._lock:
+            item = self._sessoes.get(k)
+            if item:
+                item[1] = time.monotonic()
+                item[3] += usuarios
+                return item[0]
+            lock_modelo = self._carregando.setdefault(k, threading.Lock())
+
+        # Um único carregamento por modelo, mesmo com várias threads pedindo ao mesmo tempo
+        with lock_modelo:
+            with self._lock:
+                item = self._sessoes.get(k)
+                if item:
+                    item[1] = time.monotonic()
+                    item[3] += usuarios
+                    return item[0]
+            session = _criar_sessao(model, perfil)
+            memoria = _estimar_memoria(model, perfil.variante if perfil else "fp32")
+            with self._lock:
+                self._sessoes[k] = [session, time.monotonic(), memoria, usuarios]
+                self._evictar(manter=k)
+            return session
+
+    def get(self, model: str, perfil=None):
+        return self._obter(model, perfil, 0)
+
+    def adquirir(self, model: str, perfil=None):
+        """Como ``get``, mas a sessão fica fora da evicção até o ``liberar`` correspondente."""
+        return self._obter(model, perfil, 1)
+
+    def liberar(self, model: str, perfil=None):
+        with self._lock:
+            item = self._sessoes.get(self._chave(model, perfil))
+            if item:
+                item[1] = time.monotonic()
+                item[3] = max(0, item[3] - 1)
+                self._evictar()
+
+    @contextmanager
+    def usar(self, model: str, perfil=None):
+        session = self.adquirir(model, perfil)
+        try:
+            yield session
+        finally:
+            self.liberar(model, perfil)
+
+    def carregados(self):
+        with self._lock:
+            return list(self._sessoes)
+
+    def _evictar(self, manter=None):
+        """Descarta as sessões livres usadas há mais tempo até caber no limite (chamado com o lock)."""
+        total = sum(i[2] for i in self._sessoes.values())
+        for k, item in sorted(self._sessoes.items(), key=lambda kv: kv[1][1]):
+            if total <= self.max_memoria:
+                break
+            if k == manter or item[3]:
+                continue
+            total -= self._sessoes.pop(k)[2]
+
+    def limpar_ociosas(self):
+        agora = time.monotonic()
+        with self._lock:
+            for k in [k for k, i in self._sessoes.items() if not i[3] and agora - i[1] > self.max_ocioso]:
+                del self._sessoes[k]
+
+    def _limpeza(self):
+        while True:
+            time.sleep(max(5.0, self.max_ocioso / 4))
+            self.limpar_ociosas()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_aquecido = False
+
+
+def get_pool() -> SessionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SessionPool()
+        return _pool
+
+
+def get_session(model: str, perfil=None):
+    return get_pool().get(model, perfil)
+
+
+def usar_sessao(model: str, perfil=None):
+    """``with usar_sessao(model) as session:`` protege a sessão da evicção durante o uso."""
+    return get_pool().usar(model, perfil)
+
+
+def warmup(models=None):
+    """Carrega os modelos em segundo plano (uma vez por processo)."""
+    global _aquecido
+    with _pool_lock:
+        if _aquecido:
+            return
+        _aquecido = True
+
+    def _carregar():
+        for m in models or WARMUP:
+            try:
+                get_session(m)
+            except Exception:
+                pass
+
+    threading.Thread(target=_carregar, daemon=True).start()
@@ -0,0 +1,314 @@
+"""Cliente da Admin API da Shopify com controle de taxa.
+
+Um token bucket por loja (o mesmo modelo "leaky bucket" da Shopify) espaça as
+chamadas e é recalibrado a cada resposta pelo ``X-Shopify-Shop-Api-Call-Limit``;
+429 e falhas transitórias são repetidos respeitando ``Retry-After``. Todas as
+chamadas reutilizam uma Session com pool de conexões. ``V2_SHOPIFY_URL`` troca a
+URL base (ex.: ``http://127.0.0.1:8000/{shop}``) para testes contra um servidor local.
+
+A listagem de uma coleção sai como eventos ``("produto", id, título, updated_at)`` e
+``("imagem", produto_id, imagem_id, src, updated_at)``: pela REST (só os campos
+usados, 250 por página) ou, em coleções grandes, por uma Bulk Operation do GraphQL
+cujo JSONL é lido em streaming.
+"""
+import json
+import os
+import re
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+from modules.downloader import backoff, criar_sessao, espera_retry_after
+
+# ============== Configuração ==============
+URL_BASE = os.environ.get("V2_SHOPIFY_URL", "https://{shop}.myshopify.com")
+TENTATIVAS = int(os.environ.get("V2_SHOPIFY_TENTATIVAS", "8"))
+TIMEOUT = 60
+# Balde padrão da REST Admin API: 40 chamadas, vazando 2/s (Plus: 80 e 4/s)
+CAPACIDADE = 40
+TAXA = 2.0
+MARGEM = 2  # chamadas de folga para outros clientes da mesma loja
+
+REPETIR = {429, 500, 502, 503, 504}
+
+# Acima disso o modo automático usa a Bulk Operation em vez de paginar a REST
+LIMIAR_BULK = int(os.environ.get("V2_SHOPIFY_BULK_MIN", "2000"))
+INTERVALO_BULK = 2.0
+# Só o que o extrator usa (o products.json completo traz variants, options, body_html...)
+CAMPOS_PRODUTO = "id,title,updated_at,images"
+
+
+class ErroShopify(RuntimeError):
+    pass
+
+
+class TokenBucket:
+    """Balde de chamadas de uma loja: ``adquirir()`` bloqueia até haver espaço."""
+
+    def __init__(self, capacidade=CAPACIDADE, taxa=TAXA):
+        self.capacidade = capacidade
+        self.taxa = taxa
+        self.nivel = 0.0
+        self._t = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _vazar(self):
+        agora = time.monotonic()
+        self.nivel = max(0.0, self.nivel - (agora - self._t) * self.taxa)
+        self._t = agora
+
+    def adquirir(self):
+        while True:
+            with self._lock:
+                self._vazar()
+                teto = max(1, self.capacidade - MARGEM)
+                if self.nivel + 1 <= teto:
+                    self.nivel += 1
+                    return
+                espera = (self.nivel + 1 - teto) / self.taxa
+            time.sleep(espera)
+
+    def atualizar(self, cabecalho):
+        """Recalibra pelo ``X-Shopify-Shop-Api-Call-Limit`` (ex.: ``32/40``)."""
+        try:
+            usado, capacidade = (int(x) for x in cabecalho.split("/"))
+        except (AttributeError, ValueError):
+            return
+        with self._lock:
+            self._vazar()
+            if capacidade != self.capacidade:
+                # A taxa de vazamento acompanha o plano: 40 → 2/s, 80 → 4/s
+                self.taxa = TAXA * capacidade / CAPACIDADE
+                self.capacidade = capacidade
+            self.nivel = float(usado)
+
+    def cheio(self):
+        """Após um 429: trata o balde como cheio, para as próximas chamadas esperarem."""
+        with self._lock:
+            self._vazar()
+            self.nivel = float(self.capacidade)
+
+
+_baldes = {}
+_baldes_lock = threading.Lock()
+_sessao = None
+
+
+def balde(shop: str) -> TokenBucket:
+    with _baldes_lock:
+        if shop not in _baldes:
+            _baldes[shop] = TokenBucket()
+        return _baldes[shop]
+
+
+def sessao() -> requests.Session:
+    global _sessao
+    with _baldes_lock:
+        if _sessao is None:
+            _sessao = criar_sessao(8)
+        return _sessao
+
+
+class ClienteShopify:
+    """Chamadas REST de uma loja, compartilhando balde e Session com os outros clientes."""
+
+    def __init__(self, shop_name, api_version, token, url_base=None):
+        self.shop = shop_name
+        self.api_version = api_version
+        self.token = token
+        self.base = (url_base or URL_BASE).format(shop=shop_name).rstrip("/")
+        self.balde = balde(shop_name)
+
+    def url(self, recurso: str) -> str:
+        return f"{self.base}/admin/api/{self.api_version}/{recurso}"
+
+    def _requisitar(self, metodo, url, **kwargs) -> requests.Response:
+        headers = {"X-Shopify-Access-Token": self.token, "Content-Type": "application/json"}
+        for tentativa in range(1, TENTATIVAS + 1):
+            self.balde.adquirir()
+            try:
+                r = sessao().request(metodo, url, headers=headers, timeout=TIMEOUT, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if tentativa == TENTATIVAS:
+                    raise ErroShopify(f"Falha de conexão com a Shopify: {e}")
+                time.sleep(backoff(tentativa))
+                continue
+            self.balde.atualizar(r.headers.get("X-Shopify-Shop-Api-Call-Limit"))
+            if r.status_code == 200:
+                return r
+            if r.status_code in REPETIR and tentativa < TENTATIVAS:
+                if r.status_code == 429:
+                    self.balde.cheio()
+                time.sleep(espera_retry_after(r.headers.get("Retry-After"), backoff(tentativa)))
+                continue
+            try:
+                raise ErroShopify(f"Erro {r.status_code}: {r.json()}")
+            except ValueError:
+                raise ErroShopify(f"Erro {r.status_code}: {r.text[:300]}")
+        raise ErroShopify("Shopify indisponível: tentativas esgotadas.")
+
+    def get(self, url, params=None) -> requests.Response:
+        """GET com controle de taxa; ``url`` pode ser um recurso (``products.json``) ou URL completa."""
+        if not url.startswith("http"):
+            url = self.url(url)
+        return self._requisitar("GET", url, params=params)
+
+    def graphql(self, query, variables=None) -> dict:
+        """Consulta GraphQL; repete quando a Shopify devolve THROTTLED (custo de consulta esgotado)."""
+        for tentativa in range(1, TENTATIVAS + 1):
+            r = self._requisitar("POST", self.url("graphql.json"), json={"query": query, "variables": variables or {}})
+            corpo = r.json()
+            erros = corpo.get("errors") or []
+            if not erros:
+                return corpo["data"]
+            if any((e.get("extensions") or {}).get("code") == "THROTTLED" for e in erros) and tentativa < TENTATIVAS:
+                time.sleep(backoff(tentativa) + 1)
+                continue
+            raise ErroShopify(f"Erro GraphQL: {'; '.join(e.get('message', '') for e in erros)}")
+        raise ErroShopify("Shopify indisponível: tentativas esgotadas.")
+
+
+def get_collection_id(cliente: ClienteShopify, collection_input):
+    # Se for ID direto
+    if collection_input.isdigit():
+        return collection_input
+
+    # Se for URL
+    if collection_input.startswith("http"):
+        m = re.search(r"/collections/([^/?#]+)", collection_input)
+        if m:
+            handle = m.group(1)
+        else:
+            raise ErroShopify("URL de coleção inválida.")
+    else:
+        handle = collection_input
+
+    # Buscar coleção pelo handle
+    r = cliente.get("custom_collections.json", params={"handle": handle})
+    items = r.json().get("custom_collections", [])
+    if not items:
+        raise ErroShopify("Coleção não encontrada pelo handle informado.")
+    return str(items[0]["id"])
+
+
+def _id(gid) -> int:
+    """``gid://shopify/Product/123`` → 123 (IDs da REST já vêm numéricos)."""
+    return int(str(gid).rsplit("/", 1)[-1])
+
+
+def contar_produtos(cliente: ClienteShopify, collection_id) -> int:
+    r = cliente.get("products/count.json", params={"collection_id": collection_id})
+    return int(r.json().get("count", 0))
+
+
+def get_products_in_collection(cliente: ClienteShopify, collection_id):
+    """Gera os produtos da coleção pela REST, página a página, só com ``CAMPOS_PRODUTO``."""
+    url, params = "products.json", {"collection_id": collection_id, "limit": 250, "fields": CAMPOS_PRODUTO}
+    while url:
+        r = cliente.get(url, params=params)
+        yield from r.json().get("products", [])
+        # A próxima página vem pronta no Link (com page_info); não aceita os outros filtros
+        url = r.links.get("next", {}).get("url")
+        params = None if not url or "fields=" in url else {"fields": CAMPOS_PRODUTO}
+
+
+def eventos_rest(cliente: ClienteShopify, collection_id):
+    for p in get_products_in_collection(cliente, collection_id):
+        yield ("produto", p["id"], p.get("title", ""), p.get("updated_at"))
+        for img in p.get("images", []):
+            yield ("imagem", p["id"], img.get("id"), img["src"], img.get("updated_at") or p.get("updated_at"))
+
+
+def url_cdn(src: str, largura=None) -> str:
+    """URL da imagem já redimensionada pelo CDN da Shopify (``width``; nunca amplia)."""
+    if not largura:
+        return src
+    partes = urlsplit(src)
+    query = [(k, v) for k, v in parse_qsl(partes.query) if k != "width"] + [("width", str(int(largura)))]
+    return urlunsplit(partes._replace(query=urlencode(query)))
+
+
+# ============== Bulk Operation (GraphQL) ==============
+_BULK_MUTATION = """
+mutation($query: String!) {
+  bulkOperationRunQuery(query: $query) {
+    bulkOperation { id status }
+    userErrors { field message }
+  }
+}"""
+
+_BULK_CONSULTA = """
+{
+  collection(id: "gid://shopify/Collection/%s") {
+    products {
+      edges { node { id title updatedAt images { edges { node { id url } } } } }
+    }
+  }
+}"""
+
+_BULK_STATUS = """
+query($id: ID!) {
+  node(id: $id) { ... on BulkOperation { status errorCode objectCount url } }
+}"""
+
+_BULK_CANCELAR = """
+mutation($id: ID!) { bulkOperationCancel(id: $id) { userErrors { message } } }"""
+
+
+def eventos_bulk(cliente: ClienteShopify, collection_id, progresso=None):
+    """Roda a Bulk Operation da coleção e gera os eventos lendo o JSONL em streaming.
+
+    No JSONL cada objeto vem numa linha própria (filhos com ``__parentId``), então
+    cada produto ou imagem já pode seguir para CSV e download.
+    """
+    r = cliente.graphql(_BULK_MUTATION, {"query": _BULK_CONSULTA % collection_id})["bulkOperationRunQuery"]
+    if r["userErrors"]:
+        raise ErroShopify("Bulk Operation recusada: " + "; ".join(e["message"] for e in r["userErrors"]))
+    op_id = r["bulkOperation"]["id"]
+    try:
+        while True:
+            op = cliente.graphql(_BULK_STATUS, {"id": op_id})["node"]
+            if op["status"] == "COMPLETED":
+                break
+            if op["status"] in ("FAILED", "CANCELED", "CANCELLED", "EXPIRED"):
+                raise ErroShopify(f"Bulk Operation terminou como {op['status']} ({op.get('errorCode')}).")
+            if progresso is not None:
+                progresso(0, 1, f"Exportação em massa na Shopify: {op.get('objectCount') or 0} objetos...")
+            time.sleep(INTERVALO_BULK)
+    except BaseException:
+        # Job cancelado ou erro: não deixa a operação ocupando a vaga de bulk da loja
+        try:
+            cliente.graphql(_BULK_CANCELAR, {"id": op_id})
+        except Exception:
+            pass
+        raise
+
+    if not op.get("url"):  # coleção vazia
+        return
+    produtos = {}
+    # URL assinada do resultado: sem o token da loja e fora do balde da API
+    with sessao().get(op["url"], stream=True, timeout=TIMEOUT) as resp:
+        resp.raise_for_status()
+        for linha in resp.iter_lines():
+            if not linha:
+                continue
+            obj = json.loads(linha)
+            # Tipo pelo gid: a coleção (raiz) e os produtos (filhos dela) também aparecem no JSONL
+            gid = str(obj.get("id", ""))
+            if gid.startswith("gid://shopify/ProductImage/"):
+                pai = _id(obj["__parentId"])
+                yield ("imagem", pai, _id(gid), obj["url"], produtos.get(pai))
+            elif gid.startswith("gid://shopify/Product/"):
+                produtos[_id(gid)] = obj.get("updatedAt")
+                yield ("produto", _id(gid), obj.get("title", ""), obj.get("updatedAt"))
+
+
+def eventos_colecao(cliente: ClienteShopify, collection_id, modo="auto", progresso=None):
+    """Eventos da coleção pelo modo pedido: ``rest``, ``bulk`` ou ``auto`` (pelo tamanho)."""
+    if modo == "auto":
+        modo = "bulk" if contar_produtos(cliente, collection_id) >= LIMIAR_BULK else "rest"
+    if modo == "bulk":
+        return eventos_bulk(cliente, collection_id, progresso)
+    return eventos_rest(cliente, collection_id)
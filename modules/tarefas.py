@@ -0,0 +1,400 @@
+"""Tarefas das ferramentas, sem Streamlit: rodam nos workers da fila de jobs.
+
+Assinatura comum: ``tarefa(pasta, params, progresso) -> dict``. ``params`` vem
+do JSON do job (tuplas chegam como listas e são normalizadas aqui) e
+``progresso(feitos, total, mensagem)`` grava o avanço e interrompe o job
+quando ele é cancelado.
+"""
+import os
+import pickle
+import re
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+
+from modules.cache_resultados import get_cache, hash_bytes, chave
+from modules.deduplicacao import LIMIAR_SEMELHANTES, Deduplicador
+from modules.entrada import ArquivoLocal, arquivos_locais, fatiar, listar_entradas
+from modules.pool_processos import executar_em_janela, get_process_pool, planejar_workers
+from modules.workspace import QuotaExcedida
+from modules.zip_saida import ZipWriter
+
+MAX_ERROS = 50
+
+
+def _tupla(v):
+    return None if v is None else tuple(v)
+
+
+def entradas_do_job(params, erros=None):
+    """Entradas do job: uploads gravados na pasta do job (``arquivos``) ou
+    caminhos do disco (``caminhos``), opcionalmente só a fatia ``shard = [i, n]``.
+    """
+    if "caminhos" in params:
+        arquivos = arquivos_locais(params["caminhos"], erros)
+    else:
+        arquivos = [ArquivoLocal(c, n) for c, n in params["arquivos"]]
+    entradas = listar_entradas(arquivos, erros)
+    if params.get("shard"):
+        entradas = fatiar(entradas, *params["shard"])
+    return entradas
+
+
+def _processar(entradas, worker, n_workers, writer, progresso):
+    """Roda ``worker`` sobre as entradas; devolve (itens, erros, quota_excedida)."""
+    itens, erros, quota = [], [], False
+    tot = len(entradas)
+    # O pool sai antes do writer: os workers ainda em voo precisam do consumidor do ZIP vivo
+    with writer, ThreadPoolExecutor(max_workers=n_workers) as ex:
+        try:
+            for i, f in enumerate(executar_em_janela(ex, worker, entradas, n_workers * 2), 1):
+                try:
+                    itens.append(f.result())
+                except QuotaExcedida as e:
+                    erros.append(str(e))
+                    quota = True
+                    break
+                except Exception as e:
+                    if len(erros) < MAX_ERROS:
+                        erros.append(f"Erro ao processar: {e}")
+                del f
+                progresso(i, tot, f"Processado {i}/{tot}")
+        except BaseException:
+            # Cancelamento: descarta o que ainda não começou
+            ex.shutdown(wait=True, cancel_futures=True)
+            raise
+        if quota:
+            ex.shutdown(wait=True, cancel_futures=True)
+    return itens, erros, quota
+
+
+# ============== Conversor ==============
+def converter_lote(pasta: Path, params: dict, progresso) -> dict:
+    from modules.conversao import converter_bytes, converter_variantes, converter_variantes_bytes
+
+    fan_out = params["fan_out"]
+    alvos = [tuple(a) for a in params.get("alvos", [])]
+    cores = [_tupla(c) for c in params.get("cores", [])]
+    formatos = list(params.get("formatos", []))
+    target = _tupla(params.get("target"))
+    bg_rgb = _tupla(params.get("bg_rgb"))
+    out_format = params["out_format"]
+    rapido, perfil_cod, max_bytes = params["rapido"], params["perfil_cod"], params["max_bytes"]
+    processos = params["execucao"] == "Processos"
+
+    entradas = entradas_do_job(params)
+    dedup = Deduplicador(perceptual=params["semelhantes"], limiar=LIMIAR_SEMELHANTES) if params["deduplicar"] else None
+    cache = get_cache()
+    zip_path = str(pasta / params.get("nome_zip", "convertidas.zip"))
+    writer = ZipWriter(zip_path, limite=params.get("limite"))
+    acima, acima_lock = [], threading.Lock()  # arquivos que nem no mínimo couberam em max_bytes
+
+    def converter(raw: bytes):
+        """Lista de (pasta da variante, formato, bytes)."""
+        pool = get_process_pool("conversor", threads=1) if processos else None
+        if fan_out:
+            if processos:
+                blob = pool.submit(converter_variantes_bytes, raw, alvos, cores, formatos, rapido, perfil_cod, max_bytes).result()
+                return pickle.loads(blob)
+            return converter_variantes(raw, alvos, cores, formatos, rapido, perfil_cod, max_bytes)
+        if processos:
+            return [("", out_format, pool.submit(converter_bytes, raw, target, bg_rgb, out_format, rapido, perfil_cod, max_bytes).result())]
+        return [("", out_format, converter_bytes(raw, target, bg_rgb, out_format, rapido, perfil_cod, max_bytes))]
+
+    def worker(e):
+        raw = e.ler()
+
+        # Jobs repetidos só recalculam entradas novas ou alteradas
+        h = hash_bytes(raw)
+        if fan_out:
+            k = chave(h, "conversor-variantes", alvos, cores, formatos, rapido, perfil_cod, max_bytes)
+        else:
+            k = chave(h, "conversor", target, bg_rgb, out_format.lower(), rapido, perfil_cod, max_bytes)
+
+        def calcular():
+            if cache.get(k) is None:
+                saidas = converter(raw)
+                cache.put(k, pickle.dumps(saidas) if fan_out else saidas[0][2])
+            return k
+
+        # Duplicadas reaproveitam a chave (no cache) do resultado da primeira ocorrência
+        if dedup is not None:
+            k, _ = dedup.resolver(raw, h, calcular)
+        else:
+            calcular()
+        blob = cache.get(k)
+        if blob is not None:
+            saidas = pickle.loads(blob) if fan_out else [("", out_format, blob)]
+        else:  # evictado entre a gravação e a leitura
+            saidas = converter(raw)
+        for pasta_var, fmt, data in saidas:
+            arc = PurePosixPath(pasta_var, e.rel).with_suffix("." + fmt).as_posix()
+            if max_bytes and len(data) > max_bytes:
+                with acima_lock:
+                    acima.append((arc, len(data)))
+            writer.put(arc, data)
+        return [e.rel, PurePosixPath(saidas[0][0], e.rel).with_suffix("." + saidas[0][1]).as_posix(), k]
+
+    n_cpus = os.cpu_count() or 1
+    n_workers = max(8, n_cpus * 2) if processos else 8
+    itens, erros, quota = _processar(entradas, worker, n_workers, writer, progresso)
+    if acima:
+        acima.sort()
+        erros.extend(f"Acima do limite de {max_bytes // 1024} KB: {arc} ({n // 1024} KB)"
+                     for arc, n in acima[:MAX_ERROS])
+        if len(acima) > MAX_ERROS:
+            erros.append(f"... e mais {len(acima) - MAX_ERROS} arquivos acima do limite.")
+    return {
+        "zip": zip_path,
+        "itens": itens,
+        "erros": erros,
+        "quota": quota,
+        "resumo": dedup.resumo() if dedup is not None else None,
+    }
+
+
+# ============== Removedor de fundo ==============
+def remover_lote(pasta: Path, params: dict, progresso) -> dict:
+    from modules.perfis_onnx import PADRAO, PerfilOnnx
+    from modules.recorte import BatchInferer, finalizador_canvas, remover_bytes, remover_rembg, remover_reduzido
+    from modules.sessoes_onnx import get_pool, usar_sessao
+
+    model = params["model"]
+    perfil = PerfilOnnx(**params["perfil"]) if params.get("perfil") else None
+    variante = (perfil or PADRAO).variante
+    reduzir, refinar = params["reduzir"], params["refinar"]
+    processos = params["execucao"] == "Processos"
+    em_lote = not processos and params["em_lote"]
+    tamanho_lote = params["tamanho_lote"]
+    canvas = params.get("canvas")
+    if canvas is not None:
+        canvas = (tuple(canvas[0]), _tupla(canvas[1]), canvas[2])
+    finalizar = finalizador_canvas(canvas)
+    ext_saida = "." + canvas[2] if canvas else ".png"
+    n_w, n_t = planejar_workers()
+
+    entradas = entradas_do_job(params)
+    dedup = Deduplicador(perceptual=params["semelhantes"], limiar=LIMIAR_SEMELHANTES) if params["deduplicar"] else None
+    cache = get_cache()
+    inferer = None
+    inferer_lock = threading.Lock()
+
+    def remover(raw: bytes) -> bytes:
+        # O modelo só é carregado se alguma imagem não estiver no cache
+        nonlocal inferer
+        if processos:
+            pool = get_process_pool("removedor", workers=n_w, threads=n_t)
+            return pool.submit(remover_bytes, raw, model, reduzir, refinar, perfil, canvas).result()
+        if not em_lote:
+            with usar_sessao(model, perfil) as session:
+                if reduzir:
+                    return remover_reduzido(raw, session, model, refinar, finalizar)
+                return remover_rembg(raw, session, finalizar)
+        with inferer_lock:
+            if inferer is None:
+                # O inferer segura a sessão o job inteiro: fica adquirida até o close()
+                inferer = BatchInferer(get_pool().adquirir(model, perfil), model, tamanho=tamanho_lote)
+        return inferer.remove(raw, reduzir, refinar, finalizar)
+
+    # ZIP final gravado em disco conforme cada imagem fica pronta (memória constante)
+    zip_path = str(pasta / params.get("nome_zip", "sem_fundo.zip"))
+    writer = ZipWriter(zip_path, limite=params.get("limite"))
+    indices = {id(e): i for i, e in enumerate(entradas)}
+
+    def worker(e):
+        raw = e.ler()
+        h = hash_bytes(raw)
+        k = chave(h, "removedor", model, variante, reduzir, reduzir and refinar, canvas)
+
+        def calcular():
+            if cache.get(k) is None:
+                cache.put(k, remover(raw))
+            return k
+
+        # Duplicadas reaproveitam a chave (no cache) do resultado da primeira ocorrência
+        if dedup is not None:
+            k, _ = dedup.resolver(raw, h, calcular)
+        else:
+            calcular()
+        out_bytes = cache.get(k)
+        if out_bytes is None:  # evictado entre a gravação e a leitura
+            out_bytes = remover(raw)
+        name = PurePosixPath(e.rel).with_suffix(ext_saida).as_posix()
+        writer.put(name, out_bytes)
+        return [indices[id(e)], name, h, k]
+
+    # No modo em lote, mais threads que o tamanho do lote para mantê-lo cheio
+    n_workers = max(4, tamanho_lote + 2) if em_lote else 4
+    if processos:
+        n_workers = max(4, n_w * 2)
+    try:
+        itens, erros, quota = _processar(entradas, worker, n_workers, writer, progresso)
+    finally:
+        if inferer is not None:
+            inferer.close()
+            get_pool().liberar(model, perfil)
+    return {
+        "zip": zip_path,
+        "itens": itens,
+        "erros": erros,
+        "quota": quota,
+        "resumo": dedup.resumo() if dedup is not None else None,
+    }
+
+
+# ============== Extrator Shopify ==============
+def exportar_colecao(pasta: Path, params: dict, progresso) -> dict:
+    import pandas as pd
+    from modules.conversao import converter_bytes
+    from modules.downloader import Downloader, gravar_relatorio
+    from modules.manifesto import caminho_catalogo, get_manifesto
+    from modules.shopify import ClienteShopify, eventos_colecao, get_collection_id, url_cdn
+
+    inicio = time.time()
+    loja = params["shop_name"]
+    cliente = ClienteShopify(loja, params["api_version"], params["access_token"])
+    manifesto = get_manifesto()
+    largura = params.get("largura_cdn")
+    # Conversão no download, ``[target, bg_rgb, fmt]``: bytes da CDN → resize/encode do
+    # conversor → ZIP, sem passar pelo disco (e sem o catálogo local)
+    conversao = params.get("conversao") if params["baixar"] else None
+    if conversao:
+        conversao = (tuple(conversao[0]), _tupla(conversao[1]), conversao[2])
+
+    progresso(0, 1, "Buscando produtos da coleção...")
+    collection_id = get_collection_id(cliente, params["collection_input"])
+    eventos = eventos_colecao(cliente, collection_id, params.get("modo_api", "auto"), progresso)
+    zip_name = f"imagens_colecao_{collection_id}.zip"
+    zip_path = os.path.join(pasta, zip_name)
+
+    # A listagem alimenta CSV e downloads conforme chega (REST página a página ou JSONL do bulk)
+    dados = {}  # produto_id -> linha do CSV, na ordem de chegada
+    arquivos = []  # (caminho no catálogo, nome no ZIP)
+    pendentes = {}  # caminho no catálogo -> (produto_id, imagem_id, src, updated_at)
+    nomes_zip = {}  # URL -> nomes no ZIP (modo conversão)
+    n_imagens = inalteradas = 0
+
+    def tarefas():
+        nonlocal n_imagens, inalteradas
+        for ev in eventos:
+            if ev[0] == "produto":
+                # Atualiza em vez de substituir: imagens podem ter chegado antes do produto
+                dados.setdefault(ev[1], {"Título": ""})["Título"] = ev[2]
+                if not params["baixar"]:
+                    progresso(len(dados), len(dados) + 1, f"Listando produtos: {len(dados)}")
+                continue
+            _, produto_id, imagem_id, src, updated_at = ev
+            item = dados.setdefault(produto_id, {"Título": ""})
+            i = len(item)  # "Título" + imagens anteriores
+            item[f"Imagem {i}"] = src
+            n_imagens += 1
+            if not params["baixar"]:
+                continue
+            titulo = re.sub(r'[\\/*?:\"<>|]', "_", item["Título"])
+            url = url_cdn(src, largura)
+            if conversao:
+                nomes_zip.setdefault(url, []).append(f"{titulo}/{i}.{conversao[2]}")
+                yield url, None
+                continue
+            # O catálogo local persiste entre exportações; o ZIP mantém a pasta por produto
+            ext = PurePosixPath(src.split("?")[0]).suffix.lower() or ".jpg"
+            imagem_id = imagem_id or hash_bytes(src.encode())[:16]
+            if largura:
+                imagem_id = f"{imagem_id}_w{largura}"
+            destino = caminho_catalogo(loja, produto_id, imagem_id, ext)
+            arquivos.append((destino, f"{titulo}/{i}{ext}"))
+            anterior = manifesto.get(loja, produto_id, imagem_id)
+            if anterior is not None and os.path.exists(destino):
+                if anterior["updated_at"] == updated_at and anterior["src"] == src:
+                    manifesto.tocar(loja, produto_id, imagem_id)
+                    inalteradas += 1
+                    continue
+                cabecalhos = {}
+                if anterior["etag"]:
+                    cabecalhos["If-None-Match"] = anterior["etag"]
+                if anterior["last_modified"]:
+                    cabecalhos["If-Modified-Since"] = anterior["last_modified"]
+            else:
+                cabecalhos = None
+            pendentes[destino] = (produto_id, imagem_id, src, updated_at)
+            yield url, destino, cabecalhos
+
+    def registrar(r):
+        # Registrado a cada download: uma exportação interrompida retoma daqui
+        if r.ok and r.destino in pendentes:
+            produto_id, imagem_id, src, updated_at = pendentes.pop(r.destino)
+            novo = r.status != 304
+            manifesto.registrar(loja, produto_id, imagem_id, src, updated_at, r.destino, r.etag, r.last_modified,
+                                r.sha256 if novo else None, r.bytes if novo else None)
+
+    writer = ZipWriter(zip_path, limite=params.get("limite")) if conversao else None
+    quota = []
+    lock = threading.Lock()
+
+    def processar(r):
+        if quota:
+            raise quota[0]
+        data = converter_bytes(r.conteudo, *conversao)
+        with lock:
+            arcname = nomes_zip[r.url].pop(0)
+        try:
+            writer.put(arcname, data)
+        except QuotaExcedida as e:
+            quota.append(e)
+            raise
+
+    resultados = []
+    if params["baixar"]:
+        # Turbo = pool de conexões com vários downloads simultâneos; sem turbo, um por vez
+        downloader = Downloader() if params["turbo"] else Downloader(workers=1)
+        if writer is not None:
+            with writer:
+                resultados = downloader.baixar_todos(tarefas(), progresso, processar=processar)
+            if quota:
+                raise quota[0]
+        else:
+            resultados = downloader.baixar_todos(tarefas(), progresso, registrar)
+    else:
+        for _ in tarefas():
+            pass
+    if not dados:
+        return {"produtos": 0}
+
+    resultado = {"produtos": len(dados), "imagens": n_imagens if params["baixar"] else 0, "zip": None}
+    if params["baixar"]:
+        relatorio = os.path.join(pasta, "relatorio_downloads.csv")
+        gravar_relatorio(resultados, relatorio)
+        falhas = [r for r in resultados if not r.ok]
+        resultado.update(
+            relatorio=relatorio,
+            baixadas=sum(r.ok and r.status != 304 for r in resultados),
+            inalteradas=inalteradas + sum(r.status == 304 for r in resultados if r.ok),
+            falhas=[[r.url, r.erro] for r in falhas[:MAX_ERROS]],
+            n_falhas=len(falhas),
+        )
+
+    if writer is not None:
+        if writer.total:
+            resultado.update(zip=zip_path, zip_nome=zip_name)
+    elif params["baixar"]:
+        # Imagens que falharam agora mas têm versão anterior no catálogo entram com ela
+        arquivos = [(c, arc) for c, arc in arquivos if os.path.exists(c)]
+        limite = params.get("limite")
+        if limite is not None and sum(os.path.getsize(c) for c, _ in arquivos) > limite:
+            raise QuotaExcedida(f"Espaço da sessão esgotado ({limite // (1024 * 1024)} MB livres).")
+
+        if arquivos:
+            with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
+                for caminho, arcname in arquivos:
+                    zipf.write(caminho, arcname)
+            resultado.update(zip=zip_path, zip_nome=zip_name)
+        # Teto do catálogo: sai o que nenhuma exportação recente usou
+        manifesto.liberar(antes_de=inicio)
+
+    csv_name = f"imagens_colecao_{collection_id}.csv"
+    csv_path = os.path.join(pasta, csv_name)
+    pd.DataFrame(list(dados.values())).to_csv(csv_path, index=False, encoding="utf-8-sig")
+    resultado.update(csv=csv_path, csv_nome=csv_name)
+    return resultado
@@ -0,0 +1,136 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+# ============== Configuração ==============
+QUOTA = int(os.environ.get("V2_WORKSPACE_QUOTA_MB", "4096")) * 1024 * 1024
+TTL = float(os.environ.get("V2_WORKSPACE_TTL_S", str(6 * 3600)))
+_MARCADOR = ".ultimo_uso"
+
+
+class QuotaExcedida(RuntimeError):
+    pass
+
+
+def _base() -> Path:
+    """tmpfs (/dev/shm) quando há espaço para algumas quotas; senão o temp do sistema."""
+    if os.environ.get("V2_WORKSPACE_DIR"):
+        return Path(os.environ["V2_WORKSPACE_DIR"])
+    shm = Path("/dev/shm")
+    try:
+        st_ = os.statvfs(shm)
+        if os.access(shm, os.W_OK) and st_.f_bavail * st_.f_frsize > 4 * QUOTA:
+            return shm / "v2labs"
+    except (OSError, AttributeError):
+        pass
+    return Path(tempfile.gettempdir()) / "v2labs"
+
+
+BASE = _base()
+
+
+def tamanho(pasta) -> int:
+    total = 0
+    for raiz, _, arquivos in os.walk(pasta):
+        for a in arquivos:
+            try:
+                total += os.path.getsize(os.path.join(raiz, a))
+            except OSError:
+                pass
+    return total
+
+
+class Workspace:
+    """Pasta isolada de uma sessão: cada job ganha uma subpasta própria."""
+
+    def __init__(self, id_: str, quota: int = QUOTA):
+        self.id = id_
+        self.quota = quota
+        self.path = BASE / id_
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.tocar()
+
+    def tocar(self):
+        (self.path / _MARCADOR).touch()
+
+    def uso(self) -> int:
+        return tamanho(self.path)
+
+    def restante(self) -> int:
+        return max(0, self.quota - self.uso())
+
+    def verificar_quota(self):
+        if self.uso() > self.quota:
+            raise QuotaExcedida(f"Espaço da sessão esgotado ({self.quota // (1024 * 1024)} MB).")
+
+    def novo_job(self, ferramenta: str) -> Path:
+        """Cria a pasta de um job, descartando os jobs anteriores da mesma ferramenta."""
+        self.tocar()
+        for antigo in self.path.glob(f"{ferramenta}-*"):
+            shutil.rmtree(antigo, ignore_errors=True)
+        pasta = self.path / f"{ferramenta}-{uuid.uuid4().hex[:8]}"
+        pasta.mkdir(parents=True)
+        return pasta
+
+
+def manter_vivo(pasta):
+    """Renova o TTL do workspace que contém ``pasta`` (nada faz fora de ``BASE``)."""
+    try:
+        rel = Path(pasta).resolve().relative_to(BASE.resolve())
+    except (ValueError, OSError):
+        return
+    if rel.parts:
+        try:
+            (BASE / rel.parts[0] / _MARCADOR).touch()
+        except OSError:
+            pass
+
+
+def workspace_da_sessao(estado) -> Workspace:
+    """Workspace associado ao ``st.session_state`` (ou qualquer dict por usuário)."""
+    if "workspace_id" not in estado:
+        estado["workspace_id"] = uuid.uuid4().hex
+    iniciar_limpeza()
+    return Workspace(estado["workspace_id"])
+
+
+# ============== Limpeza por TTL ==============
+def limpar_expirados(ttl: float = TTL):
+    agora = time.time()
+    if not BASE.exists():
+        return
+    for pasta in BASE.iterdir():
+        if not pasta.is_dir():
+            continue
+        try:
+            ultimo = (pasta / _MARCADOR).stat().st_mtime
+        except OSError:
+            ultimo = pasta.stat().st_mtime
+        if agora - ultimo > ttl:
+            shutil.rmtree(pasta, ignore_errors=True)
+
+
+_limpeza_iniciada = False
+_limpeza_lock = threading.Lock()
+
+
+def iniciar_limpeza():
+    global _limpeza_iniciada
+    with _limpeza_lock:
+        if _limpeza_iniciada:
+            return
+        _limpeza_iniciada = True
+
+    def _loop():
+        while True:
+            try:
+                limpar_expirados()
+            except Exception:
+                pass
+            time.sleep(max(60.0, TTL / 10))
+
+    threading.Thread(target=_loop, daemon=True).start()
@@ -0,0 +1,83 @@
+import queue
+import threading
+import zipfile
+from pathlib import PurePosixPath
+
+from modules.workspace import QuotaExcedida
+
+# Formatos que já são comprimidos: DEFLATE só gastaria CPU
+JA_COMPRIMIDOS = {".png", ".jpg", ".jpeg", ".webp", ".gif", ".zip"}
+
+
+class ZipWriter:
+    """Grava as entradas de um ZIP numa thread própria, alimentada direto pelos workers.
+
+    A montagem do ZIP acontece em paralelo ao processamento; a fila limitada
+    segura os workers se o disco ficar para trás.
+    """
+
+    def __init__(self, destino, max_fila: int = 64, limite=None):
+        self.destino = destino
+        self.limite = limite
+        self.total = 0
+        self.bytes = 0
+        self._fila = queue.Queue(maxsize=max_fila)
+        self._erro = None
+        self._fechado = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def put(self, arcname: str, data: bytes):
+        if self._erro is not None:
+            raise self._erro
+        if self._fechado:
+            raise RuntimeError("ZIP de saída já foi fechado.")
+        with self._lock:
+            self.bytes += len(data)
+            if self.limite is not None and self.bytes > self.limite:
+                raise QuotaExcedida("Espaço da sessão esgotado: o ZIP de saída passou da quota.")
+        # Com timeout: um worker atrasado nunca fica preso numa fila sem consumidor
+        while True:
+            try:
+                self._fila.put((arcname, data), timeout=0.5)
+                return
+            except queue.Full:
+                if self._erro is not None:
+                    raise self._erro
+                if self._fechado or not self._thread.is_alive():
+                    raise RuntimeError("ZIP de saída já foi fechado.")
+
+    def close(self):
+        if self._fechado:
+            return
+        self._fechado = True
+        self._fila.put(None)
+        self._thread.join()
+        if self._erro is not None:
+            raise self._erro
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _loop(self):
+        try:
+            with zipfile.ZipFile(self.destino, "w", zipfile.ZIP_DEFLATED) as z:
+                while True:
+                    item = self._fila.get()
+                    if item is None:
+                        return
+                    arcname, data = item
+                    tipo = zipfile.ZIP_STORED if PurePosixPath(arcname).suffix.lower() in JA_COMPRIMIDOS else zipfile.ZIP_DEFLATED
+                    z.writestr(arcname, data, compress_type=tipo)
+                    self.total += 1
+        except Exception as e:
+            self._erro = e
+            # Esvazia a fila para não travar workers bloqueados em put()
+            while True:
+                item = self._fila.get()
+                if item is None:
+                    return
@@ -0,0 +1,40 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from modules import tarefas
+from modules.cache_resultados import ResultCache
+from modules.codificacao import QUALIDADE_MIN, _salvar, codificar
+
+
+def _ruido_rgba(lado=256, semente=0):
+    rng = np.random.default_rng(semente)
+    return Image.fromarray(rng.integers(0, 256, (lado, lado, 4), dtype=np.uint8), mode="RGBA")
+
+
+def test_webp_busca_alpha_quality_quando_qualidade_nao_basta():
+    img = _ruido_rgba()
+    minimo_sem_alfa = len(_salvar(img, "webp", quality=QUALIDADE_MIN))
+    max_bytes = minimo_sem_alfa * 3 // 4
+    data = codificar(img, "webp", max_bytes=max_bytes)
+    assert len(data) <= max_bytes
+    assert Image.open(io.BytesIO(data)).mode == "RGBA"
+
+
+def test_converter_lote_lista_arquivos_acima_do_limite(tmp_path, monkeypatch):
+    monkeypatch.setattr(tarefas, "get_cache", lambda: ResultCache(pasta=tmp_path / "cache"))
+    caminhos = []
+    for i in range(2):
+        p = tmp_path / f"ruido{i}.png"
+        _ruido_rgba(128, i).save(p)
+        caminhos.append((str(p), p.name))
+    params = {
+        "arquivos": caminhos, "fan_out": False, "target": (128, 128), "bg_rgb": None, "out_format": "jpg",
+        "rapido": True, "perfil_cod": "rápido", "max_bytes": 1024, "execucao": "Threads",
+        "semelhantes": False, "deduplicar": False,
+    }
+    r = tarefas.converter_lote(tmp_path, params, lambda *a, **k: None)
+    assert len(r["itens"]) == 2
+    acima = [e for e in r["erros"] if e.startswith("Acima do limite")]
+    assert len(acima) == 2 and "ruido0.jpg" in acima[0]
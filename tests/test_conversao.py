@@ -0,0 +1,30 @@
+import io
+
+import pytest
+from PIL import Image
+
+from modules.conversao import abrir_para_alvo, converter_bytes
+
+
+def _png(img):
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("modo", ["P", "I;16", "1", "L", "RGBA"])
+def test_converte_modos_grandes_com_decodificacao_reduzida(modo):
+    img = Image.new("RGB", (2400, 1200), (200, 30, 30))
+    img = img.convert(modo) if modo != "I;16" else Image.new("I;16", (2400, 1200), 40000)
+    raw = _png(img)
+    reduzida = abrir_para_alvo(raw, (1080, 1080))
+    assert reduzida.width < 2400
+    saida = Image.open(io.BytesIO(converter_bytes(raw, (1080, 1080), None, "png")))
+    assert saida.size == (1080, 1080)
+
+
+def test_paleta_mantem_cores():
+    img = Image.new("RGB", (2400, 2400), (10, 120, 240)).convert("P", palette=Image.Palette.ADAPTIVE)
+    saida = Image.open(io.BytesIO(converter_bytes(_png(img), (600, 600), None, "png"))).convert("RGB")
+    r, g, b = saida.getpixel((300, 300))
+    assert abs(r - 10) < 8 and abs(g - 120) < 8 and abs(b - 240) < 8
@@ -0,0 +1,55 @@
+import io
+
+from PIL import Image, ImageDraw
+
+from modules.deduplicacao import LIMIAR_SEMELHANTES, Deduplicador, dhash
+
+
+def _foto(cor, tamanho=(400, 400), fmt="PNG"):
+    img = Image.new("RGB", tamanho, (245, 245, 245))
+    d = ImageDraw.Draw(img)
+    w, h = tamanho
+    d.ellipse((w // 5, h // 5, 4 * w // 5, 4 * h // 5), fill=cor)
+    buf = io.BytesIO()
+    img.save(buf, fmt)
+    return buf.getvalue()
+
+
+def _resolver(dedup, raw, nome):
+    return dedup.resolver(raw, nome, lambda: nome)
+
+
+def test_variantes_de_cor_nao_sao_duplicadas():
+    vermelho, azul = _foto((200, 20, 20)), _foto((20, 20, 200))
+    assert bin(dhash(vermelho) ^ dhash(azul)).count("1") <= LIMIAR_SEMELHANTES
+    dedup = Deduplicador(perceptual=True, limiar=LIMIAR_SEMELHANTES)
+    assert _resolver(dedup, vermelho, "a") == ("a", False)
+    assert _resolver(dedup, azul, "b") == ("b", False)
+
+
+def test_copia_redimensionada_e_duplicada():
+    dedup = Deduplicador(perceptual=True, limiar=LIMIAR_SEMELHANTES)
+    assert _resolver(dedup, _foto((200, 20, 20)), "a") == ("a", False)
+    assert _resolver(dedup, _foto((200, 20, 20), (200, 200), "JPEG"), "b") == ("a", True)
+
+
+def test_proporcao_diferente_nao_e_duplicada():
+    dedup = Deduplicador(perceptual=True, limiar=64)
+    _resolver(dedup, _foto((200, 20, 20)), "a")
+    assert _resolver(dedup, _foto((200, 20, 20), (400, 600)), "b") == ("b", False)
+
+
+def test_indice_por_faixas_acha_todo_par_dentro_do_limiar():
+    import random
+
+    from modules.deduplicacao import _faixas
+
+    rnd = random.Random(0)
+    faixas = _faixas(LIMIAR_SEMELHANTES)
+    assert sum(bin(m).count("1") for _, m in faixas) == 64
+    for _ in range(2000):
+        a = rnd.getrandbits(64)
+        b = a
+        for bit in rnd.sample(range(64), rnd.randint(0, LIMIAR_SEMELHANTES)):
+            b ^= 1 << bit
+        assert any((a >> d) & m == (b >> d) & m for d, m in faixas)
@@ -0,0 +1,77 @@
+import csv
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from modules import downloader
+from modules.downloader import Downloader, gravar_relatorio
+
+CORPO = b"\xff\xd8" + b"x" * 4096
+
+
+class _Stub(BaseHTTPRequestHandler):
+    """``/lento`` responde 429 uma vez, ``/truncado`` corta o corpo, ``/ok`` serve a imagem."""
+    protocol_version = "HTTP/1.1"
+    chamadas = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, status, corpo=b"", extras=None, tamanho=None):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(corpo) if tamanho is None else tamanho))
+        for k, v in (extras or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_GET(self):
+        n = type(self).chamadas[self.path] = type(self).chamadas.get(self.path, 0) + 1
+        if self.path == "/lento" and n == 1:
+            return self._responder(429, extras={"Retry-After": "0.3"})
+        if self.path == "/truncado":
+            self.close_connection = True
+            return self._responder(200, CORPO[:1000], tamanho=len(CORPO))
+        if self.path in ("/ok", "/lento"):
+            return self._responder(200, CORPO, {"ETag": '"v1"'})
+        return self._responder(404)
+
+
+@pytest.fixture
+def base(monkeypatch):
+    _Stub.chamadas = {}
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setattr(downloader, "backoff", lambda tentativa: 0)
+    yield f"http://127.0.0.1:{srv.server_port}"
+    srv.shutdown()
+
+
+def test_429_espera_retry_after_e_repete(base, tmp_path):
+    t0 = time.monotonic()
+    res = Downloader(workers=2, tentativas=3).baixar(f"{base}/lento", str(tmp_path / "a.jpg"))
+    assert res.ok and res.tentativas == 2 and res.etag == '"v1"'
+    assert time.monotonic() - t0 >= 0.3
+    assert (tmp_path / "a.jpg").read_bytes() == CORPO
+
+
+def test_corpo_truncado_nao_deixa_parcial(base, tmp_path):
+    destino = tmp_path / "sub" / "b.jpg"
+    res = Downloader(workers=2, tentativas=2).baixar(f"{base}/truncado", str(destino))
+    assert not res.ok and res.tentativas == 2 and res.erro
+    assert _Stub.chamadas["/truncado"] == 2
+    assert list(tmp_path.rglob("*")) == [tmp_path / "sub"]
+
+
+def test_relatorio_por_url(base, tmp_path):
+    tarefas = [(f"{base}/ok", str(tmp_path / "ok.jpg")), (f"{base}/sumiu", str(tmp_path / "sumiu.jpg"))]
+    resultados = Downloader(workers=2, tentativas=3).baixar_todos(tarefas)
+    caminho = tmp_path / "relatorio.csv"
+    gravar_relatorio(resultados, str(caminho))
+    linhas = {r["url"]: r for r in csv.DictReader(open(caminho, encoding="utf-8-sig"))}
+    assert "conteudo" not in next(iter(linhas.values()))
+    ok, sumiu = linhas[f"{base}/ok"], linhas[f"{base}/sumiu"]
+    assert ok["ok"] == "True" and int(ok["bytes"]) == len(CORPO) and ok["sha256"]
+    assert sumiu["ok"] == "False" and sumiu["erro"] == "HTTP 404" and sumiu["tentativas"] == "1"
@@ -0,0 +1,40 @@
+import zipfile
+
+from PIL import Image
+
+from modules.api import converter
+from modules.entrada import arquivos_locais, fatiar
+
+
+def _imagem(caminho):
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", (20, 20), (255, 0, 0)).save(caminho)
+    return caminho
+
+
+def test_avulsos_guardam_caminho_relativo_a_raiz_comum(tmp_path):
+    a = _imagem(tmp_path / "catalogo" / "p1" / "1.jpg")
+    b = _imagem(tmp_path / "catalogo" / "p2" / "1.jpg")
+    assert [f.name for f in arquivos_locais([str(a), str(b)])] == ["p1/1.jpg", "p2/1.jpg"]
+    assert [f.name for f in arquivos_locais([str(a)])] == ["1.jpg"]
+
+
+def test_avulsos_com_mesmo_nome_nao_duplicam_no_zip(tmp_path):
+    caminhos = [str(_imagem(tmp_path / "catalogo" / p / "1.jpg")) for p in ("p1", "p2")]
+    r = converter(caminhos, tmp_path / "saida", alvos=[(10, 10)])
+    nomes = zipfile.ZipFile(r["zip"]).namelist()
+    assert sorted(nomes) == ["p1/1.png", "p2/1.png"]
+
+
+def test_fatias_dos_avulsos_cobrem_tudo_sem_repetir(tmp_path):
+    caminhos = [str(_imagem(tmp_path / f"p{i}" / "1.jpg")) for i in range(6)]
+    arquivos = arquivos_locais(caminhos)
+
+    class E:
+        def __init__(self, rel):
+            self.rel = rel
+
+    entradas = [E(f.name) for f in arquivos]
+    assert len({e.rel for e in entradas}) == 6
+    fatias = [e.rel for i in range(3) for e in fatiar(entradas, i, 3)]
+    assert sorted(fatias) == sorted(e.rel for e in entradas)
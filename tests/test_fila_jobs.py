@@ -0,0 +1,44 @@
+import time
+
+from modules.fila_jobs import CONCLUIDO, FINAIS, RODANDO, Broker, Fila
+
+
+def _esperar(fila, id_, timeout=10):
+    fim = time.time() + timeout
+    while time.time() < fim:
+        st = fila.status(id_)
+        if st["estado"] in FINAIS:
+            return st
+        time.sleep(0.05)
+    return fila.status(id_)
+
+
+def test_job_com_segredos_so_roda_na_fila_que_submeteu(tmp_path, monkeypatch):
+    db = tmp_path / "jobs.sqlite3"
+    vistos = []
+
+    def tarefa(pasta, params, progresso):
+        vistos.append(params.get("access_token"))
+        return {"ok": True}
+
+    monkeypatch.setattr("modules.fila_jobs._resolver", lambda ferramenta: tarefa)
+    # Outra instância no mesmo banco (outro processo do app) já esperando jobs
+    outra = Fila(Broker(db), limites={"extrator": 2}).iniciar()
+    dona = Fila(Broker(db), limites={"extrator": 1})  # workers só sobem depois
+    id_ = dona.submeter("extrator", tmp_path, {}, segredos={"access_token": "shpat"})
+
+    time.sleep(1.0)
+    assert dona.status(id_)["estado"] not in (RODANDO, *FINAIS)
+    assert outra.broker.reivindicar("extrator", None, outra.id) is None
+
+    dona.iniciar()
+    assert _esperar(dona, id_)["estado"] == CONCLUIDO
+    assert vistos == ["shpat"]
+
+
+def test_job_sem_segredos_roda_em_qualquer_fila(tmp_path):
+    db = tmp_path / "jobs.sqlite3"
+    dona = Fila(Broker(db), limites={"conversor": 0})
+    outra = Broker(db)
+    id_ = dona.submeter("conversor", tmp_path, {})
+    assert outra.reivindicar("conversor", None, "outra")["id"] == id_
@@ -0,0 +1,33 @@
+import time
+
+from modules import manifesto
+from modules.manifesto import Manifesto
+
+
+def _registrar(m, pasta, imagem_id, tamanho=100):
+    caminho = pasta / f"{imagem_id}.jpg"
+    caminho.write_bytes(b"x" * tamanho)
+    m.registrar("loja", 1, imagem_id, f"https://cdn/{imagem_id}.jpg", "A", str(caminho), hash_="h", bytes_=tamanho)
+    return caminho
+
+
+def test_liberar_remove_as_menos_usadas(tmp_path, monkeypatch):
+    monkeypatch.setattr(manifesto, "PROTECAO", 0)
+    m = Manifesto(tmp_path / "m.sqlite3")
+    antigos = [_registrar(m, tmp_path, i) for i in range(3)]
+    m.tocar("loja", 1, 0)  # a primeira foi usada de novo
+    time.sleep(0.01)
+    atual = _registrar(m, tmp_path, 9)
+
+    removidas = m.liberar(limite=250, antes_de=time.time() - 0.005)
+    assert removidas == 2
+    assert antigos[0].exists() and atual.exists()
+    assert not antigos[1].exists() and not antigos[2].exists()
+    assert m.get("loja", 1, 1) is None
+
+
+def test_liberar_protege_exportacao_em_andamento(tmp_path):
+    m = Manifesto(tmp_path / "m.sqlite3")
+    caminhos = [_registrar(m, tmp_path, i) for i in range(3)]
+    assert m.liberar(limite=0) == 0
+    assert all(c.exists() for c in caminhos)
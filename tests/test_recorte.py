@@ -0,0 +1,58 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from modules import recorte
+from modules.recorte import BatchInferer
+
+
+class _Entrada:
+    name = "entrada"
+
+
+class _Ort:
+    def __init__(self):
+        self.lotes = []
+
+    def get_inputs(self):
+        return [_Entrada()]
+
+    def run(self, saidas, feed):
+        tensor = feed["entrada"]
+        self.lotes.append(len(tensor))
+        return [np.ones((len(tensor), 1) + tensor.shape[2:], dtype=np.float32)]
+
+
+class _Sessao:
+    def __init__(self):
+        self.inner_session = _Ort()
+
+
+def test_lote_so_roda_o_modelo_na_thread_do_lote(monkeypatch):
+    threads = {"pre": set(), "mascara": set()}
+    pre, mascara = recorte._preprocessar, recorte._mascara
+
+    def _pre(img, model):
+        threads["pre"].add(threading.current_thread().name)
+        return pre(img, model)
+
+    def _masc(pred, tamanho):
+        threads["mascara"].add(threading.current_thread().name)
+        return mascara(pred, tamanho)
+
+    monkeypatch.setattr(recorte, "_preprocessar", _pre)
+    monkeypatch.setattr(recorte, "_mascara", _masc)
+
+    sessao = _Sessao()
+    inferer = BatchInferer(sessao, "u2net", tamanho=4, latencia=0.5)
+    imgs = [Image.new("RGB", (640 + i, 480), (i, 0, 0)) for i in range(8)]
+    with ThreadPoolExecutor(8, thread_name_prefix="worker") as ex:
+        masks = list(ex.map(inferer.mascara, imgs))
+    inferer.close()
+
+    assert [m.size for m in masks] == [i.size for i in imgs]
+    assert sum(sessao.inner_session.lotes) == 8 and max(sessao.inner_session.lotes) > 1
+    assert inferer._thread.name not in threads["pre"] | threads["mascara"]
+    assert all(n.startswith("worker") for n in threads["pre"] | threads["mascara"])
@@ -0,0 +1,32 @@
+import time
+
+from modules import sessoes_onnx
+from modules.sessoes_onnx import SessionPool
+
+
+def _pool(monkeypatch, **kwargs):
+    monkeypatch.setattr(sessoes_onnx, "_criar_sessao", lambda model, perfil=None: object())
+    monkeypatch.setattr(sessoes_onnx, "_estimar_memoria", lambda model, variante="fp32": 100)
+    return SessionPool(**kwargs)
+
+
+def test_sessao_em_uso_nao_sai_por_ociosidade(monkeypatch):
+    pool = _pool(monkeypatch, max_memoria=1000, max_ocioso=0.01)
+    pool.adquirir("u2net")
+    pool.get("isnet-general-use")
+    time.sleep(0.02)
+    pool.limpar_ociosas()
+    assert pool.carregados() == [("u2net", None)]
+    pool.liberar("u2net")
+    time.sleep(0.02)
+    pool.limpar_ociosas()
+    assert pool.carregados() == []
+
+
+def test_limite_de_memoria_pula_sessoes_em_uso(monkeypatch):
+    pool = _pool(monkeypatch, max_memoria=150, max_ocioso=60)
+    with pool.usar("u2net"):
+        pool.get("isnet-general-use")
+        assert set(pool.carregados()) == {("u2net", None), ("isnet-general-use", None)}
+    # Liberada, a evicção volta a valer e o pool cabe no limite (sai a usada há mais tempo)
+    assert pool.carregados() == [("u2net", None)]
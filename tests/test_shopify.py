@@ -0,0 +1,179 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from modules import shopify
+from modules.shopify import ClienteShopify, TokenBucket, eventos_bulk
+
+COLECAO = "gid://shopify/Collection/77"
+
+
+def _linhas_bulk(base):
+    """Layout real do JSONL de uma consulta com raiz na coleção."""
+    linhas = [{"id": COLECAO}]
+    for p in range(3):
+        linhas.append({"id": f"gid://shopify/Product/{p}", "title": f"Prod {p}",
+                       "updatedAt": "2024-01-01T00:00:00Z", "__parentId": COLECAO})
+        for i in range(2):
+            linhas.append({"id": f"gid://shopify/ProductImage/{p}{i}", "url": f"{base}/img/{p}{i}.jpg",
+                           "__parentId": f"gid://shopify/Product/{p}"})
+    # Uma imagem antes do produto pai (a ordem das linhas não é garantida)
+    linhas.insert(1, {"id": "gid://shopify/ProductImage/90", "url": f"{base}/img/90.jpg",
+                      "__parentId": "gid://shopify/Product/9"})
+    linhas.append({"id": "gid://shopify/Product/9", "title": "Prod 9", "updatedAt": "2024-01-01T00:00:00Z",
+                   "__parentId": COLECAO})
+    return linhas
+
+
+class _Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    polls = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _enviar(self, corpo, tipo="application/json"):
+        data = corpo if isinstance(corpo, bytes) else json.dumps(corpo).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        base = f"http://127.0.0.1:{self.server.server_port}"
+        if "count.json" in self.path:
+            return self._enviar({"count": 5000})
+        if self.path.startswith("/resultado.jsonl"):
+            return self._enviar(("\n".join(json.dumps(l) for l in _linhas_bulk(base)) + "\n").encode(), "application/jsonl")
+        if self.path.startswith("/img/"):
+            return self._enviar(b"\xff\xd8jpeg", "image/jpeg")
+        self.send_response(404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        corpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if "bulkOperationRunQuery" in corpo["query"]:
+            assert "Collection/77" in corpo["variables"]["query"]
+            return self._enviar({"data": {"bulkOperationRunQuery": {
+                "bulkOperation": {"id": "gid://shopify/BulkOperation/1", "status": "CREATED"}, "userErrors": []}}})
+        type(self).polls += 1
+        if type(self).polls == 1:
+            return self._enviar({"errors": [{"message": "Throttled", "extensions": {"code": "THROTTLED"}}]})
+        pronto = type(self).polls > 2
+        url = f"http://127.0.0.1:{self.server.server_port}/resultado.jsonl" if pronto else None
+        return self._enviar({"data": {"node": {"status": "COMPLETED" if pronto else "RUNNING",
+                                               "errorCode": None, "objectCount": "10", "url": url}}})
+
+
+@pytest.fixture
+def loja(monkeypatch):
+    _Stub.polls = 0
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setattr(shopify, "INTERVALO_BULK", 0.01)
+    monkeypatch.setattr(shopify, "backoff", lambda tentativa: 0)
+    monkeypatch.setattr(shopify, "URL_BASE", f"http://127.0.0.1:{srv.server_port}/{{shop}}")
+    yield srv
+    srv.shutdown()
+
+
+def test_eventos_bulk_ignora_colecao_e_separa_por_tipo(loja):
+    eventos = list(eventos_bulk(ClienteShopify("loja", "2024-01", "t"), "77"))
+    produtos = [e for e in eventos if e[0] == "produto"]
+    imagens = [e for e in eventos if e[0] == "imagem"]
+    assert [p[1] for p in produtos] == [0, 1, 2, 9]
+    assert len(imagens) == 7
+    assert ("imagem", 9, 90) == imagens[0][:3]
+
+
+def test_exportar_colecao_em_bulk(loja, tmp_path, monkeypatch):
+    pytest.importorskip("pandas")
+    from modules import manifesto, tarefas
+
+    monkeypatch.setattr(manifesto, "CATALOGO_DIR", tmp_path / "catalogo")
+    monkeypatch.setattr(manifesto, "_manifesto", manifesto.Manifesto(tmp_path / "manifesto.sqlite3"))
+    params = {"shop_name": "loja", "api_version": "2024-01", "access_token": "t", "collection_input": "77",
+              "baixar": False, "turbo": True, "modo_api": "auto"}
+    r = tarefas.exportar_colecao(tmp_path, params, lambda *a: None)
+    assert r["produtos"] == 4
+    linhas = open(r["csv"], encoding="utf-8-sig").read().splitlines()
+    assert "Prod 9," in "\n".join(linhas) and len(linhas) == 5
+
+
+class _Limitado(BaseHTTPRequestHandler):
+    """REST com balde: responde ``respostas`` em ordem (status, cabeçalhos) e depois 200."""
+    protocol_version = "HTTP/1.1"
+    respostas = []
+    chamadas = 0
+    limite = "1/40"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        cls = type(self)
+        cls.chamadas += 1
+        status, extras = cls.respostas.pop(0) if cls.respostas else (200, {})
+        data = json.dumps({"ok": status == 200}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("X-Shopify-Shop-Api-Call-Limit", cls.limite)
+        for k, v in extras.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def limitada(monkeypatch):
+    _Limitado.respostas, _Limitado.chamadas, _Limitado.limite = [], 0, "1/40"
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Limitado)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setattr(shopify, "_baldes", {})
+    monkeypatch.setattr(shopify, "backoff", lambda tentativa: 0)
+    yield ClienteShopify("loja", "2024-01", "t", url_base=f"http://127.0.0.1:{srv.server_port}/{{shop}}")
+    srv.shutdown()
+
+
+def test_balde_espera_quando_cheio():
+    b = TokenBucket(capacidade=4, taxa=10.0)
+    t0 = time.monotonic()
+    for _ in range(4):  # teto = 4 - MARGEM = 2: as duas últimas esperam vazar
+        b.adquirir()
+    assert time.monotonic() - t0 >= 0.15
+
+
+def test_balde_recalibra_pelo_cabecalho_da_loja(limitada):
+    _Limitado.limite = "79/80"
+    limitada.get("products.json")
+    assert limitada.balde.capacidade == 80 and limitada.balde.taxa == 4.0
+    # Nível 79 com teto 78: a próxima chamada espera ~0,5 s o balde vazar
+    t0 = time.monotonic()
+    limitada.get("products.json")
+    assert time.monotonic() - t0 >= 0.4
+    assert _Limitado.chamadas == 2
+
+
+def test_429_respeita_retry_after_e_enche_o_balde(limitada, monkeypatch):
+    cheios = []
+    monkeypatch.setattr(TokenBucket, "cheio", lambda self: cheios.append(self))
+    _Limitado.respostas = [(429, {"Retry-After": "0.3"})]
+    t0 = time.monotonic()
+    r = limitada.get("products.json")
+    assert r.json() == {"ok": True}
+    assert _Limitado.chamadas == 2
+    assert time.monotonic() - t0 >= 0.3
+    assert cheios == [limitada.balde]
+
+
+def test_erro_definitivo_nao_repete(limitada):
+    _Limitado.respostas = [(404, {})]
+    with pytest.raises(shopify.ErroShopify, match="404"):
+        limitada.get("products.json")
+    assert _Limitado.chamadas == 1
@@ -0,0 +1,41 @@
+import threading
+
+import pytest
+
+from modules.fila_jobs import JobCancelado
+from modules.tarefas import _processar
+from modules.zip_saida import ZipWriter
+
+
+def test_cancelar_no_meio_do_job_termina(tmp_path):
+    writer = ZipWriter(str(tmp_path / "saida.zip"))
+
+    def worker(e):
+        for j in range(6):
+            writer.put(f"{e}/{j}.png", b"x" * 1024)
+        return e
+
+    def progresso(i, total, mensagem=""):
+        if i == 5:
+            raise JobCancelado()
+
+    erro = []
+
+    def rodar():
+        try:
+            _processar(list(range(200)), worker, 16, writer, progresso)
+        except JobCancelado as e:
+            erro.append(e)
+
+    t = threading.Thread(target=rodar, daemon=True)
+    t.start()
+    t.join(timeout=30)
+    assert not t.is_alive(), "job travou após o cancelamento"
+    assert erro
+
+
+def test_put_depois_de_fechado_falha(tmp_path):
+    writer = ZipWriter(str(tmp_path / "saida.zip"))
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.put("a.png", b"x")
@@ -0,0 +1,38 @@
+import os
+import time
+
+from modules import fila_jobs, workspace
+
+
+def _envelhecer(pasta):
+    antigo = time.time() - 3600
+    os.utime(pasta / workspace._MARCADOR, (antigo, antigo))
+
+
+def test_progresso_do_job_renova_o_ttl(tmp_path, monkeypatch):
+    monkeypatch.setattr(workspace, "BASE", tmp_path / "ws")
+    ws = workspace.Workspace("sessao")
+    pasta = ws.novo_job("conversor")
+    _envelhecer(ws.path)
+
+    broker = fila_jobs.Broker(tmp_path / "jobs.sqlite3")
+    id_ = broker.submeter("conversor", pasta, {})
+    fila_jobs.Progresso(broker, id_, pasta=str(pasta))(1, 10, "1/10")
+
+    workspace.limpar_expirados(ttl=60)
+    assert pasta.exists()
+
+
+def test_workspace_ocioso_expira(tmp_path, monkeypatch):
+    monkeypatch.setattr(workspace, "BASE", tmp_path / "ws")
+    ws = workspace.Workspace("sessao")
+    pasta = ws.novo_job("conversor")
+    _envelhecer(ws.path)
+    workspace.limpar_expirados(ttl=60)
+    assert not pasta.exists()
+
+
+def test_manter_vivo_fora_da_base_nao_faz_nada(tmp_path, monkeypatch):
+    monkeypatch.setattr(workspace, "BASE", tmp_path / "ws")
+    workspace.manter_vivo(tmp_path / "saida_da_cli")
+    assert not (tmp_path / workspace._MARCADOR).exists()